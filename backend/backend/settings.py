@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -95,6 +96,50 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# locmem - для одного процесса, file - общий кэш для нескольких процессов на одной машине
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'managment',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', BASE_DIR / 'cache'),
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('DJANGO_CACHE', 'locmem')],
+}
+
+USER_BOARDS_CACHE_TIMEOUT = 60 * 60
+# сколько секунд процесс держит маску роли без сверки с БД (managment/roles.py)
+ROLE_MASK_TTL = 60
+
+# размер части для потоковых списков (?stream=1)
+LIST_STREAM_CHUNK_SIZE = 500
+
+# Push-канал досок (managment/events.py, managment/push.py).
+# memory - подписчики одного процесса, postgres - несколько узлов через
+# LISTEN/NOTIFY. События сворачиваются в одно сообщение за тик (секунды).
+BOARD_EVENTS_BROKERS = {
+    'memory': 'managment.events.InProcessBroker',
+    'postgres': 'managment.events.PostgresBroker',
+}
+BOARD_EVENTS_BROKER = BOARD_EVENTS_BROKERS[
+    os.environ.get('DJANGO_EVENTS_BROKER', 'memory')
+]
+BOARD_EVENTS_TICK = 0.25
+BOARD_EVENTS_HEARTBEAT = 15
+
+# Статусы и блоки новой доски, если при создании передано "defaults": true
+BOARD_DEFAULT_STATUS_TASKS = ['To do', 'In progress', 'Done']
+BOARD_DEFAULT_BLOCKS = ['Backlog', 'Current', 'Done']
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -141,9 +186,27 @@ AUTH_USER_MODEL = 'managment.User'
 #'rest_framework_simplejwt.authentication.JWTAuthentication',
 
 
+# Выдавать токены с участием в досках и маской роли: аутентификация и большинство
+# проверок доступа идут без запросов к БД (managment/authentication.py).
+# Токены без этих claims MembershipJWTAuthentication проверяет как обычный JWT.
+# Нужен общий для процессов кэш (DJANGO_CACHE=file), иначе проверка
+# managment.E001 не даст запуститься.
+STATELESS_JWT = os.environ.get('STATELESS_JWT', '') == '1'
+# эпоха токена читается из кэша, сбрасывается при каждой смене
+TOKEN_EPOCH_CACHE_TIMEOUT = 60 * 60
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'managment.authentication.MembershipJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'managment.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'managment.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 100,
@@ -183,8 +246,16 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 
-    "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": (
+        "managment.authentication.MembershipTokenObtainPairSerializer"
+        if STATELESS_JWT
+        else "rest_framework_simplejwt.serializers.TokenObtainPairSerializer"
+    ),
+    "TOKEN_REFRESH_SERIALIZER": (
+        "managment.authentication.MembershipTokenRefreshSerializer"
+        if STATELESS_JWT
+        else "rest_framework_simplejwt.serializers.TokenRefreshSerializer"
+    ),
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
@@ -16,7 +16,8 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from managment.views import  UserAPIView, StatusTaskAPIView, UserRoleAPIView, UserBoardAPIView, BoardAPIView, CommentAPIView, BlockAPIView, TaskAPIView
+from managment.views import  UserAPIView, StatusTaskAPIView, UserRoleAPIView, UserBoardAPIView, BoardAPIView, CommentAPIView, BlockAPIView, TaskAPIView, SearchAPIView
+from managment.push import board_events
 from rest_framework import routers
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -33,9 +34,11 @@ router.register(r'boards', BoardAPIView)
 router.register(r'comments', CommentAPIView)
 router.register(r'blocks', BlockAPIView)
 router.register(r'tasks', TaskAPIView)
+router.register(r'search', SearchAPIView, basename='search')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/boards/<int:pk>/events/', board_events, name='board_events'),
     path('api/', include(router.urls)),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -0,0 +1,146 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User, UserBoard
+from .roles import ROLE_PERMISSION_FIELDS, compile_role_mask
+
+# Режим токенов без обращения к БД (STATELESS_JWT в settings.py).
+# Access-токен содержит флаги пользователя, участие в досках с маской роли
+# и эпоху пользователя. Эпоха меняется при изменении участия или ролей,
+# после этого claims старого токена не используются и проверки идут через БД.
+
+BOARDS_CLAIM = 'boards'
+EPOCH_CLAIM = 'epoch'
+USER_FLAG_CLAIMS = ('username', 'is_staff', 'is_superuser', 'is_active')
+
+
+def token_epoch_cache_key(id_user):
+    return 'managment:token_epoch:%s' % id_user
+
+
+# Эпоха хранится в User.token_epoch и меняется в той же транзакции, что
+# участие или роль. Кэш (общий для процессов, см. checks.py) только
+# ускоряет чтение; None - пользователя нет.
+def get_token_epoch(id_user):
+    key = token_epoch_cache_key(id_user)
+    epoch = cache.get(key)
+    if epoch is None:
+        epoch = (
+            User.objects.filter(id=id_user)
+            .values_list('token_epoch', flat=True)
+            .first()
+        )
+        if epoch is not None:
+            cache.set(key, epoch, settings.TOKEN_EPOCH_CACHE_TIMEOUT)
+    return epoch
+
+
+# запись из кэша удаляется сразу и после коммита: иначе ее мог бы заново
+# заполнить запрос, прочитавший эпоху до коммита
+def bump_token_epoch(*users_id):
+    User.objects.filter(id__in=users_id).update(token_epoch=F('token_epoch') + 1)
+    keys = [token_epoch_cache_key(id_user) for id_user in users_id]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# {id_board: [id UserBoard, id роли, is_admin, маска роли]}, ключи - строки (JSON)
+def build_board_claims(id_user):
+    rows = UserBoard.objects.filter(id_user=id_user).values(
+        'id',
+        'id_board',
+        'id_user_role',
+        'is_admin',
+        *['id_user_role__' + field for field in ROLE_PERMISSION_FIELDS],
+    )
+
+    claims = {}
+    for row in rows:
+        mask = compile_role_mask(
+            {field: row['id_user_role__' + field] for field in ROLE_PERMISSION_FIELDS}
+        )
+        claims[str(row['id_board'])] = [
+            row['id'],
+            row['id_user_role'],
+            bool(row['is_admin']),
+            int(mask),
+        ]
+    return claims
+
+
+def add_membership_claims(token, id_user):
+    user = User.objects.filter(id=id_user).values(*USER_FLAG_CLAIMS).first()
+    if user is None:
+        return token
+
+    # эпоха берется до чтения участия, чтобы не пропустить изменение между ними
+    token[EPOCH_CLAIM] = get_token_epoch(id_user)
+    for claim in USER_FLAG_CLAIMS:
+        token[claim] = user[claim]
+    token[BOARDS_CLAIM] = build_board_claims(id_user)
+    return token
+
+
+class MembershipRefreshToken(RefreshToken):
+    # claims добавляются только в access-токен, каждый refresh берет их заново
+    @property
+    def access_token(self):
+        access = super().access_token
+        return add_membership_claims(access, self[api_settings.USER_ID_CLAIM])
+
+
+class MembershipTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = MembershipRefreshToken
+
+
+class MembershipTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = MembershipRefreshToken
+
+
+# Пользователь из claims токена. Поля, которых нет в токене,
+# загружаются из БД при первом обращении.
+class MembershipTokenUser(TokenUser):
+    @property
+    def board_claims(self):
+        return self.token[BOARDS_CLAIM]
+
+    def __eq__(self, other):
+        other_id = getattr(other, 'id', None)
+        if other_id is None:
+            return NotImplemented
+        return self.id == other_id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+
+        if attr in self.token:
+            return self.token[attr]
+
+        if '_db_user' not in self.__dict__:
+            self.__dict__['_db_user'] = User.objects.get(id=self.id)
+        return getattr(self.__dict__['_db_user'], attr)
+
+
+class MembershipJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if BOARDS_CLAIM in validated_token and EPOCH_CLAIM in validated_token:
+            id_user = validated_token.get(api_settings.USER_ID_CLAIM)
+            if validated_token[EPOCH_CLAIM] == get_token_epoch(id_user):
+                return MembershipTokenUser(validated_token)
+
+        # токен без claims или с устаревшей эпохой - обычная проверка через БД
+        return super().get_user(validated_token)
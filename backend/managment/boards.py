@@ -0,0 +1,243 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .authentication import bump_token_epoch
+from .membership import invalidate_user_boards
+from .models import (
+    Block,
+    Board,
+    BoardChange,
+    Comment,
+    StatusTask,
+    Task,
+    UserBoard,
+    UserRole,
+)
+from .ranks import rank_between
+from .versions import record_board_change, record_board_objects
+
+# Создание доски одной транзакцией: доска, роль администратора, участие
+# создателя и, по желанию, статусы и блоки по умолчанию. id строк берутся
+# из INSERT ... RETURNING, дочерние строки вставляются bulk_create, поэтому
+# сигналы не вызываются - журнал и кэши участия обновляются здесь.
+# Копия доски (clone_board) собирается так же: строки читаются одним
+# запросом на модель, внешние ключи переназначаются в памяти.
+
+ADMIN_ROLE = {
+    'name': 'admin_role',
+    'delete_members': True,
+    'edit_members': True,
+    'editing_role': True,
+    'deleting_role': True,
+    'creating_role': True,
+}
+
+# задач в одной пачке чтения и INSERT при копировании
+CLONE_BATCH_SIZE = 1000
+# строк в одном DELETE при очистке удаленной доски
+PURGE_CHUNK_SIZE = 1000
+
+# порядок очистки: сначала строки, на которые никто не ссылается
+PURGE_ORDER = (
+    Comment,
+    Task,
+    Block,
+    StatusTask,
+    UserBoard,
+    UserRole,
+    BoardChange,
+)
+
+
+def default_blocks(id_board):
+    blocks = []
+    rank = None
+    for name in settings.BOARD_DEFAULT_BLOCKS:
+        rank = rank_between(rank, None)
+        blocks.append(Block(id_board_id=id_board, name=name, rank=rank))
+    return blocks
+
+
+def create_board(user, name, defaults=False):
+    with transaction.atomic():
+        board = Board.objects.create(name=name)
+        [role] = UserRole.objects.bulk_create([UserRole(id_board=board, **ADMIN_ROLE)])
+        [user_board] = UserBoard.objects.bulk_create(
+            [UserBoard(id_user=user, id_board=board, id_user_role=role, is_admin=True)]
+        )
+
+        created = [role, user_board]
+        if defaults:
+            created += StatusTask.objects.bulk_create(
+                [
+                    StatusTask(id_board=board, name=status_name)
+                    for status_name in settings.BOARD_DEFAULT_STATUS_TASKS
+                ]
+            )
+            created += Block.objects.bulk_create(default_blocks(board.id))
+        record_board_objects(board.id, created, BoardChange.INSERT)
+
+        invalidate_creator(user)
+    return board
+
+
+# то же, что сигналы UserBoard: индекс досок и claims токена создателя
+def invalidate_creator(user):
+    invalidate_user_boards(user.id)
+    bump_token_epoch(user.id)
+    transaction.on_commit(lambda: invalidate_user_boards(user.id))
+
+
+# новый объект с полями obj, кроме первичного ключа; values - по attname
+def copy_row(obj, **values):
+    fields = {
+        field.attname: getattr(obj, field.attname)
+        for field in obj._meta.concrete_fields
+        if not field.primary_key
+    }
+    fields.update(values)
+    return type(obj)(**fields)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# копирует строки queryset, возвращает ({старый id: новый}, копии)
+def _clone_rows(queryset, **values):
+    source = list(queryset.order_by('id'))
+    copies = queryset.model.objects.bulk_create(
+        [copy_row(obj, **values) for obj in source], batch_size=CLONE_BATCH_SIZE
+    )
+    return {obj.id: copy.id for obj, copy in zip(source, copies)}, copies
+
+
+# Копия доски: роли, статусы, блоки и, по желанию, задачи. Участники
+# и комментарии не копируются, создатель становится администратором
+# с копией своей роли. Число запросов не зависит от размера доски,
+# кроме чтения и INSERT задач пачками по CLONE_BATCH_SIZE.
+def clone_board(user, source, name, tasks=False):
+    with transaction.atomic():
+        board = Board.objects.create(name=name)
+        roles, role_copies = _clone_rows(source.roles.all(), id_board_id=board.id)
+        statuses, status_copies = _clone_rows(
+            source.status_tasks.all(), id_board_id=board.id
+        )
+        blocks, block_copies = _clone_rows(
+            Block.objects.filter(id_board=source.id), id_board_id=board.id
+        )
+        created = role_copies + status_copies + block_copies
+
+        # задачи читаются и вставляются пачками, в памяти - одна пачка
+        if tasks:
+            source_tasks = (
+                Task.objects.filter(id_board=source.id)
+                .order_by('id')
+                .iterator(chunk_size=CLONE_BATCH_SIZE)
+            )
+            for batch in batches(source_tasks, CLONE_BATCH_SIZE):
+                task_copies = Task.objects.bulk_create(
+                    [
+                        copy_row(
+                            task,
+                            id_board_id=board.id,
+                            id_block_id=blocks[task.id_block_id],
+                            id_status_task_id=statuses[task.id_status_task_id],
+                        )
+                        for task in batch
+                    ]
+                )
+                record_board_objects(
+                    board.id, task_copies, BoardChange.INSERT, publish=False
+                )
+
+        id_role = (
+            UserBoard.objects.filter(id_board=source.id, id_user=user.id)
+            .values_list('id_user_role', flat=True)
+            .first()
+        )
+        if id_role is not None:
+            id_role = roles[id_role]
+        else:
+            [role] = UserRole.objects.bulk_create(
+                [UserRole(id_board=board, **ADMIN_ROLE)]
+            )
+            created.append(role)
+            id_role = role.id
+
+        created += UserBoard.objects.bulk_create(
+            [
+                UserBoard(
+                    id_user=user, id_board=board, id_user_role_id=id_role, is_admin=True
+                )
+            ]
+        )
+        # новую доску еще никто не слушает, события брокеру не нужны
+        record_board_objects(board.id, created, BoardChange.INSERT, publish=False)
+        invalidate_creator(user)
+    return board
+
+
+# Удаление доски за постоянное время: доска отмечается удаленной, участники
+# отключаются сразу (без них доска и ее объекты недоступны), остальные строки
+# удаляет purge_board частями (команда purge_deleted_boards).
+# Board.delete() не используется: сборщик каскада загрузил бы в память
+# все блоки, задачи и комментарии.
+def delete_board(board):
+    with transaction.atomic():
+        users_id = list(
+            UserBoard.objects.filter(id_board=board.id).values_list(
+                'id_user', flat=True
+            )
+        )
+        Board.objects.filter(id=board.id).update(deleted_at=timezone.now())
+        _delete_chunk(UserBoard, board.id, None)
+        # подписчики узнают об удалении из push-канала
+        record_board_change(board.id, board, BoardChange.DELETE)
+
+        invalidate_user_boards(*users_id)
+        bump_token_epoch(*users_id)
+        transaction.on_commit(lambda: invalidate_user_boards(*users_id))
+
+
+# DELETE без загрузки строк и сигналов; limit=None - все строки доски
+def _delete_chunk(model, id_board, limit):
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    pk = quote(model._meta.pk.column)
+    column = quote(model._meta.get_field('id_board').column)
+
+    sql = 'DELETE FROM %s WHERE %s = %%s' % (table, column)
+    params = [id_board]
+    if limit is not None:
+        sql = 'DELETE FROM %s WHERE %s IN (SELECT %s FROM %s WHERE %s = %%s LIMIT %%s)'
+        sql = sql % (table, pk, pk, table, column)
+        params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+# каждая часть - отдельная транзакция, блокировки держатся недолго
+def purge_board(id_board, chunk_size=PURGE_CHUNK_SIZE):
+    deleted = 0
+    for model in PURGE_ORDER:
+        while True:
+            with transaction.atomic():
+                count = _delete_chunk(model, id_board, chunk_size)
+            deleted += count
+            if count < chunk_size:
+                break
+
+    Board.objects.filter(id=id_board, deleted_at__isnull=False).delete()
+    return deleted
+
+
+def deleted_boards():
+    return Board.objects.filter(deleted_at__isnull=False).values_list('id', flat=True)
@@ -0,0 +1,147 @@
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+from .membership import get_user_board
+from .models import Block, BoardChange, StatusTask, Task
+from .ranks import rank_between
+from .roles import RolePermission, role_can
+from .versions import record_board_changes
+
+# Пакетные операции с задачами (TaskAPIView.bulk_create / bulk_update).
+# Пакет относится к одной доске: участие проверяется один раз, блоки,
+# статусы и задачи читаются одним запросом на модель. Сигналы и save()
+# при bulk_create/bulk_update не вызываются, поэтому id_board, updated_at
+# и журнал изменений заполняются здесь. Вызывать внутри transaction.atomic().
+
+BULK_TASKS_LIMIT = 500
+
+
+# до валидации: слишком большой пакет отклоняется без прохода сериализатора
+def check_batch_size(items):
+    if len(items) > BULK_TASKS_LIMIT:
+        raise ValidationError('at most %s tasks per request' % BULK_TASKS_LIMIT)
+
+
+def _boards_of(model, objects_id, label):
+    if not objects_id:
+        return {}
+
+    boards = dict(model.objects.filter(id__in=objects_id).values_list('id', 'id_board'))
+    missing = set(objects_id) - set(boards)
+    if missing:
+        raise ValidationError(
+            'unknown %s: %s' % (label, ', '.join(map(str, sorted(missing))))
+        )
+    return boards
+
+
+def _single_board(*boards):
+    ids = set()
+    for board in boards:
+        ids.update(board.values())
+    if len(ids) != 1:
+        raise ValidationError('all tasks must belong to one board')
+    return ids.pop()
+
+
+def _authorize(request, id_board, permission):
+    if request.user.is_superuser:
+        return
+
+    user_board = get_user_board(request, id_board)
+    if not user_board:
+        raise PermissionDenied()
+    if not user_board.is_admin and not role_can(user_board, permission):
+        raise PermissionDenied()
+
+
+def _references(items):
+    blocks_id = {item['id_block_id'] for item in items if 'id_block_id' in item}
+    statuses_id = {
+        item['id_status_task_id'] for item in items if 'id_status_task_id' in item
+    }
+    return (
+        _boards_of(Block, blocks_id, 'id_block'),
+        _boards_of(StatusTask, statuses_id, 'id_status_task'),
+    )
+
+
+# задачи встают в конец своих блоков в порядке пакета
+def _append_ranks(tasks):
+    last = dict(
+        Task.objects.filter(id_block__in={task.id_block_id for task in tasks})
+        .values('id_block')
+        .annotate(rank=Max('rank'))
+        .values_list('id_block', 'rank')
+    )
+    for task in tasks:
+        task.rank = last[task.id_block_id] = rank_between(
+            last.get(task.id_block_id), None
+        )
+
+
+# items - validated_data BulkTaskSerializer
+def create_tasks(request, items):
+    if not items:
+        return []
+
+    blocks, statuses = _references(items)
+    id_board = _single_board(blocks, statuses)
+    _authorize(request, id_board, RolePermission.CREATING_TASK)
+
+    now = timezone.now()
+    tasks = [Task(id_board_id=id_board, updated_at=now, **item) for item in items]
+    for task in tasks:
+        # id новых задач назначает БД
+        task.id = None
+    _append_ranks(tasks)
+    tasks = Task.objects.bulk_create(tasks)
+    record_board_changes(
+        id_board, 'task', [task.id for task in tasks], BoardChange.INSERT
+    )
+    return tasks
+
+
+def update_tasks(request, items):
+    if not items:
+        return []
+
+    if any('id' not in item for item in items):
+        raise ValidationError('id is required for every task')
+
+    tasks_id = [item['id'] for item in items]
+    if len(set(tasks_id)) != len(tasks_id):
+        raise ValidationError('duplicate task id')
+
+    tasks = Task.objects.in_bulk(tasks_id)
+    missing = set(tasks_id) - set(tasks)
+    if missing:
+        raise ValidationError('unknown id: %s' % ', '.join(map(str, sorted(missing))))
+
+    blocks, statuses = _references(items)
+    task_boards = {task.id: task.id_board_id for task in tasks.values()}
+    id_board = _single_board(task_boards, blocks, statuses)
+    _authorize(request, id_board, RolePermission.EDITING_TASK)
+
+    now = timezone.now()
+    fields = {'updated_at'}
+    moved = []
+    for item in items:
+        task = tasks[item['id']]
+        if item.get('id_block_id', task.id_block_id) != task.id_block_id:
+            moved.append(task)
+        for field, value in item.items():
+            if field != 'id':
+                setattr(task, field, value)
+                fields.add(field)
+        task.updated_at = now
+
+    # перенесенные в другой блок - в его конец
+    if moved:
+        _append_ranks(moved)
+        fields.add('rank')
+
+    Task.objects.bulk_update(list(tasks.values()), sorted(fields))
+    record_board_changes(id_board, 'task', tasks_id, BoardChange.UPDATE)
+    return [tasks[id_task] for id_task in tasks_id]
@@ -0,0 +1,79 @@
+from collections import defaultdict
+
+from .models import BoardChange
+from .projections import serialize_rows
+from .serializers import (
+    BlockSerializer,
+    CommentSerializer,
+    StatusTaskSerializer,
+    TaskSerializer,
+    UserBoardSerializer,
+    UserRoleSerializer,
+)
+
+# Изменения доски после seq для /api/boards/{id}/changes/?since=.
+# По каждому объекту отдается только последнее изменение, для живых
+# объектов - их текущее представление (один запрос на модель).
+# Объект, перенесенный в другую доску, для этой доски считается удаленным.
+
+CHANGE_SERIALIZERS = {
+    'block': BlockSerializer,
+    'task': TaskSerializer,
+    'comment': CommentSerializer,
+    'statustask': StatusTaskSerializer,
+    'userrole': UserRoleSerializer,
+    'userboard': UserBoardSerializer,
+}
+
+
+def get_board_changes(id_board, since, limit):
+    rows = list(
+        BoardChange.objects.filter(id_board=id_board, seq__gt=since)
+        .order_by('seq')
+        .values_list('seq', 'model', 'object_id', 'action')[: limit + 1]
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    # последнее изменение объекта, в порядке seq
+    latest = {}
+    for seq, model, object_id, action in rows:
+        latest.pop((model, object_id), None)
+        latest[(model, object_id)] = (seq, action)
+
+    ids = defaultdict(list)
+    for (model, object_id), (seq, action) in latest.items():
+        if action != BoardChange.DELETE:
+            ids[model].append(object_id)
+
+    data = {}
+    for model, objects_id in ids.items():
+        serializer_class = CHANGE_SERIALIZERS[model]
+        queryset = serializer_class.Meta.model.objects.filter(
+            id__in=objects_id, id_board=id_board
+        )
+        for item in serialize_rows(serializer_class, queryset):
+            data[(model, item['id'])] = item
+
+    changes = []
+    for (model, object_id), (seq, action) in latest.items():
+        item = data.get((model, object_id))
+        # объект удален или перенесен позже: удаление придет
+        # в следующих изменениях
+        if item is None:
+            action = BoardChange.DELETE
+        changes.append(
+            {
+                'seq': seq,
+                'model': model,
+                'id': object_id,
+                'action': action,
+                'data': item,
+            }
+        )
+
+    return {
+        'seq': rows[-1][0] if rows else since,
+        'more': more,
+        'changes': changes,
+    }
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+# Эпохи токенов (authentication.py) и версии ролей (roles.py) сбрасываются
+# в кэше процесса, который изменил участие или роль. С кэшем в памяти
+# процесса остальные воркеры не видят сброса и принимают устаревшие claims.
+
+
+@register()
+def check_stateless_jwt_cache(app_configs, **kwargs):
+    if not settings.STATELESS_JWT or not isinstance(caches['default'], LocMemCache):
+        return []
+    return [
+        Error(
+            'STATELESS_JWT requires a cache shared between processes.',
+            hint='Set DJANGO_CACHE=file or configure a shared cache backend.',
+            id='managment.E001',
+        )
+    ]
@@ -0,0 +1,120 @@
+from django.db.migrations.recorder import MigrationRecorder
+
+SAME_BOARD_MIGRATION = '0019_task_same_board_constraints'
+
+# Блок и статус задачи должны принадлежать доске задачи (Task.id_board).
+# PostgreSQL проверяет это составными внешними ключами, SQLite - триггерами.
+# Нарушение приводит к IntegrityError в том же запросе, который пишет строку.
+
+POSTGRES_CONSTRAINTS = [
+    (
+        'ALTER TABLE managment_task ADD CONSTRAINT task_block_same_board '
+        'FOREIGN KEY (id_block_id, id_board_id) '
+        'REFERENCES managment_block (id, id_board)'
+    ),
+    (
+        'ALTER TABLE managment_task ADD CONSTRAINT task_status_task_same_board '
+        'FOREIGN KEY (id_status_task_id, id_board_id) '
+        'REFERENCES managment_statustask (id, id_board_id)'
+    ),
+]
+
+POSTGRES_DROP_CONSTRAINTS = [
+    'ALTER TABLE managment_task DROP CONSTRAINT IF EXISTS task_block_same_board',
+    'ALTER TABLE managment_task DROP CONSTRAINT IF EXISTS task_status_task_same_board',
+]
+
+_SQLITE_TASK_CHECK = '''
+WHEN NEW.id_board_id IS NOT (
+    SELECT id_board FROM managment_block WHERE id = NEW.id_block_id
+) OR NEW.id_board_id IS NOT (
+    SELECT id_board_id FROM managment_statustask WHERE id = NEW.id_status_task_id
+)
+BEGIN
+    SELECT RAISE(ABORT, 'task_same_board');
+END
+'''
+
+SQLITE_TRIGGERS = {
+    'task_same_board_insert': (
+        'CREATE TRIGGER IF NOT EXISTS task_same_board_insert '
+        'BEFORE INSERT ON managment_task' + _SQLITE_TASK_CHECK
+    ),
+    'task_same_board_update': (
+        'CREATE TRIGGER IF NOT EXISTS task_same_board_update '
+        'BEFORE UPDATE OF id_block_id, id_status_task_id, id_board_id '
+        'ON managment_task' + _SQLITE_TASK_CHECK
+    ),
+    'block_task_same_board': '''
+CREATE TRIGGER IF NOT EXISTS block_task_same_board
+BEFORE UPDATE OF id_board ON managment_block
+WHEN NEW.id_board IS NOT OLD.id_board
+    AND EXISTS (SELECT 1 FROM managment_task WHERE id_block_id = OLD.id)
+BEGIN
+    SELECT RAISE(ABORT, 'task_same_board');
+END
+''',
+    'status_task_task_same_board': '''
+CREATE TRIGGER IF NOT EXISTS status_task_task_same_board
+BEFORE UPDATE OF id_board_id ON managment_statustask
+WHEN NEW.id_board_id IS NOT OLD.id_board_id
+    AND EXISTS (SELECT 1 FROM managment_task WHERE id_status_task_id = OLD.id)
+BEGIN
+    SELECT RAISE(ABORT, 'task_same_board');
+END
+''',
+}
+
+
+def install_same_board_constraints(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRES_CONSTRAINTS:
+                cursor.execute(sql)
+
+        if connection.vendor == 'sqlite':
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+
+
+def uninstall_same_board_constraints(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRES_DROP_CONSTRAINTS:
+                cursor.execute(sql)
+
+        if connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute('DROP TRIGGER IF EXISTS %s' % name)
+
+
+# Миграции, которые пересоздают в SQLite таблицы блоков, статусов или задач,
+# снимают триггеры до изменения и ставят после: триггер со ссылкой на
+# пересоздаваемую таблицу ломает ее переименование.
+# migrations.RunPython(drop_sqlite_triggers, create_sqlite_triggers) в начале
+# и migrations.RunPython(create_sqlite_triggers, drop_sqlite_triggers) в конце.
+def drop_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            schema_editor.execute('DROP TRIGGER IF EXISTS %s' % name)
+
+
+def create_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQLITE_TRIGGERS.values():
+            schema_editor.execute(sql)
+
+
+# SQLite удаляет триггеры при пересоздании таблицы в миграциях,
+# поэтому после migrate они устанавливаются заново
+def reinstall_sqlite_triggers(connection):
+    if connection.vendor != 'sqlite':
+        return
+
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('managment', SAME_BOARD_MIGRATION) not in applied:
+        return
+
+    with connection.cursor() as cursor:
+        for sql in SQLITE_TRIGGERS.values():
+            cursor.execute(sql)
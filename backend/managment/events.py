@@ -0,0 +1,185 @@
+import asyncio
+import functools
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# События досок для push-канала (push.py: SSE и WebSocket).
+# Записанные в журнал изменения (versions._record) после коммита
+# публикуются в брокер одним пакетом {'seq': последний seq, 'changes': [...]}
+# на вызов. Подписчик получает не больше одного сообщения за тик
+# BOARD_EVENTS_TICK: пакеты за тик сворачиваются по объекту.
+
+# NOTIFY принимает меньше 8000 байт, запас - на board и seq пакета
+NOTIFY_CHANGES_BYTES = 7500
+
+
+def coalesce(id_board, batches):
+    latest = {}
+    for batch in batches:
+        for change in batch['changes']:
+            key = (change['model'], change['id'])
+            latest.pop(key, None)
+            latest[key] = change
+
+    return {
+        'board': id_board,
+        'seq': max(batch['seq'] for batch in batches),
+        'changes': list(latest.values()),
+    }
+
+
+# пакет по частям, каждая в JSON не длиннее limit байт
+def split_batch(batch, limit):
+    chunks = [[]]
+    size = 0
+    for change in batch['changes']:
+        length = len(json.dumps(change, separators=(',', ':'))) + 1
+        if chunks[-1] and size + length > limit:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(change)
+        size += length
+
+    return [
+        {'seq': max(change['seq'] for change in chunk), 'changes': chunk}
+        for chunk in chunks
+        if chunk
+    ]
+
+
+class Subscription:
+    def __init__(self, broker, id_board, loop):
+        self.broker = broker
+        self.id_board = id_board
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    # вызывается из любого потока
+    def put(self, batch):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, batch)
+        except RuntimeError:
+            # цикл подписчика уже закрыт
+            self.close()
+
+    # ждет первый пакет не дольше timeout (None - без ограничения),
+    # затем тик собирает остальные; по таймауту возвращает None
+    async def next_batch(self, tick, timeout=None):
+        try:
+            batches = [await asyncio.wait_for(self.queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return None
+
+        await asyncio.sleep(tick)
+        while not self.queue.empty():
+            batches.append(self.queue.get_nowait())
+        return coalesce(self.id_board, batches)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+# Подписчики текущего процесса. Достаточно для одного узла.
+class InProcessBroker:
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, id_board):
+        subscription = Subscription(self, id_board, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[id_board].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.id_board)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.id_board]
+
+    def publish(self, id_board, batch):
+        self.dispatch(id_board, batch)
+
+    def dispatch(self, id_board, batch):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(id_board, ()))
+        for subscription in subscriptions:
+            subscription.put(batch)
+
+
+# Несколько узлов: публикация через NOTIFY, каждый узел слушает канал
+# отдельным соединением в фоновом потоке и раздает события своим подписчикам.
+class PostgresBroker(InProcessBroker):
+    channel = 'board_events'
+    reconnect_delay = 1
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    # один NOTIFY на часть пакета, а не на каждое изменение
+    def publish(self, id_board, batch):
+        with connection.cursor() as cursor:
+            for chunk in split_batch(batch, NOTIFY_CHANGES_BYTES):
+                payload = json.dumps(dict(chunk, board=id_board), separators=(',', ':'))
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def subscribe(self, id_board):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name='board-events-listener', daemon=True
+                )
+                self._listener.start()
+        return super().subscribe(id_board)
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception('board events listener failed, reconnecting')
+                time.sleep(self.reconnect_delay)
+
+    def _listen_once(self):
+        wrapper = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            wrapper.ensure_connection()
+            raw = wrapper.connection
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute('LISTEN %s' % self.channel)
+
+            while True:
+                if select.select([raw], [], [], 5) == ([], [], []):
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    batch = json.loads(raw.notifies.pop(0).payload)
+                    self.dispatch(batch.pop('board'), batch)
+        finally:
+            wrapper.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.BOARD_EVENTS_BROKER)()
+
+
+# changes - [{seq, model, id, action}, ...] одного вызова _record
+def publish_board_changes(id_board, changes):
+    batch = {'seq': changes[-1]['seq'], 'changes': changes}
+    # ошибка брокера не должна ломать уже закоммиченный запрос
+    transaction.on_commit(lambda: get_broker().publish(id_board, batch), robust=True)
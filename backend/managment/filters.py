@@ -0,0 +1,84 @@
+import datetime
+
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .membership import get_user_board_ids
+
+# Фильтры списка задач (/api/tasks/?...):
+#   board=<id>                       - одна доска пользователя
+#   id_block=<id>[,<id>...]          - блоки
+#   id_status_task=<id>[,<id>...]    - статусы
+#   date_after=, date_before=        - диапазон дат (YYYY-MM-DD), включительно
+#   ordering=id|-id|date|-date       - порядок страниц (keyset)
+# Под каждый путь есть составной индекс модели Task: (id_board, date, id),
+# (id_status_task, date, id), (id_block, id); id в конце индекса - ключ
+# страницы, поэтому сортировка идет по индексу.
+
+TASK_ORDERINGS = {
+    'id': ('id',),
+    '-id': ('-id',),
+    'date': ('date', 'id'),
+    '-date': ('-date', '-id'),
+}
+
+
+def _ids(value, name):
+    try:
+        return [int(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise ValidationError({name: 'must be a comma separated list of integers'})
+
+
+def _date(value, name):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: 'must be a date in YYYY-MM-DD format'})
+
+
+class TaskFilterBackend(BaseFilterBackend):
+    ordering_param = 'ordering'
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        board = params.get('board')
+        if board is not None:
+            ids = _ids(board, 'board')
+            if len(ids) != 1:
+                raise ValidationError({'board': 'must be a single integer'})
+            board = ids[0]
+            if board not in get_user_board_ids(request.user.id):
+                raise PermissionDenied('access denied')
+            queryset = queryset.filter(id_board=board)
+
+        for name in ('id_block', 'id_status_task'):
+            value = params.get(name)
+            if value is None:
+                continue
+            ids = _ids(value, name)
+            if len(ids) == 1:
+                queryset = queryset.filter(**{name: ids[0]})
+            else:
+                queryset = queryset.filter(**{name + '__in': ids})
+
+        date_after = params.get('date_after')
+        if date_after is not None:
+            queryset = queryset.filter(date__gte=_date(date_after, 'date_after'))
+        date_before = params.get('date_before')
+        if date_before is not None:
+            queryset = queryset.filter(date__lte=_date(date_before, 'date_before'))
+
+        return queryset
+
+    # порядок для KeysetPagination; None - порядок представления по умолчанию
+    def get_ordering(self, request):
+        value = request.query_params.get(self.ordering_param)
+        if value is None:
+            return None
+        if value not in TASK_ORDERINGS:
+            raise ValidationError(
+                {self.ordering_param: 'must be one of %s' % ', '.join(TASK_ORDERINGS)}
+            )
+        return TASK_ORDERINGS[value]
@@ -0,0 +1,169 @@
+import heapq
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+from django.db import connection
+from django.db.models import Count, Max
+
+from .models import Task
+
+# Нечеткий поиск задачи по названию (/api/search/tasks/?q=) для автодополнения.
+# PostgreSQL: pg_trgm, оператор <% по GIN-индексу на Task.text (миграция 0027),
+# порог - pg_trgm.word_similarity_threshold (0.6 по умолчанию).
+# Другие БД: триграммный индекс в памяти процесса по каждой доске,
+# перестраивается, когда меняются ее задачи.
+# Триграммы и порог те же, что в pg_trgm.
+
+FUZZY_LIMIT = 10
+FUZZY_MAX_LIMIT = 50
+FUZZY_THRESHOLD = 0.6
+# досок, чьи индексы держатся в памяти
+FUZZY_CACHE_BOARDS = 256
+
+_POSTGRES_SQL = '''
+SELECT id, id_board_id, id_block_id, text, word_similarity(%s, text) AS score
+FROM managment_task
+WHERE id_board_id = ANY(%s) AND %s <%% text
+ORDER BY score DESC, similarity(%s, text) DESC, id
+LIMIT %s
+'''
+
+
+# как в pg_trgm: слова в нижнем регистре, два пробела в начале и один в конце
+def trigrams(value):
+    result = set()
+    for word in re.findall(r'\w+', value.lower()):
+        word = '  ' + word + ' '
+        result.update(word[i : i + 3] for i in range(len(word) - 2))
+    return result
+
+
+class TrigramIndex:
+    def __init__(self, rows):
+        self.tasks = {}
+        self.grams = {}
+        self.postings = defaultdict(set)
+        for id_task, id_block, text in rows:
+            self.tasks[id_task] = (id_block, text)
+            self.grams[id_task] = trigrams(text)
+            for gram in self.grams[id_task]:
+                self.postings[gram].add(id_task)
+
+    # (score, similarity, -id): score - доля триграмм запроса в названии,
+    # при равенстве - коэффициент Жаккара, затем меньший id
+    def search(self, query_grams, limit, threshold):
+        counts = defaultdict(int)
+        for gram in query_grams:
+            for id_task in self.postings.get(gram, ()):
+                counts[id_task] += 1
+
+        matches = []
+        for id_task, common in counts.items():
+            score = common / len(query_grams)
+            if score >= threshold:
+                union = len(query_grams | self.grams[id_task])
+                matches.append((score, common / union, -id_task))
+        return heapq.nlargest(limit, matches)
+
+
+class TrigramIndexCache:
+    def __init__(self, max_boards=FUZZY_CACHE_BOARDS):
+        self.max_boards = max_boards
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    # индексы досок с актуальными задачами: один запрос состояния задач
+    # (последнее изменение и число - удаление тоже меняет ключ), один
+    # запрос задач всех устаревших досок. Прочие изменения доски
+    # (комментарии, блоки) индекс не сбрасывают
+    def get(self, boards_id):
+        versions = {
+            row['id_board']: (row['updated_at'], row['count'])
+            for row in Task.objects.filter(id_board__in=boards_id)
+            .values('id_board')
+            .annotate(updated_at=Max('updated_at'), count=Count('id'))
+            .order_by()
+        }
+        indexes = {}
+        with self._lock:
+            for id_board, version in versions.items():
+                cached = self._indexes.get(id_board)
+                if cached is not None and cached[0] == version:
+                    self._indexes.move_to_end(id_board)
+                    indexes[id_board] = cached[1]
+
+        stale = [id_board for id_board in versions if id_board not in indexes]
+        if stale:
+            rows = defaultdict(list)
+            tasks = Task.objects.filter(id_board__in=stale).values_list(
+                'id_board', 'id', 'id_block', 'text'
+            )
+            for id_board, id_task, id_block, text in tasks:
+                rows[id_board].append((id_task, id_block, text))
+
+            with self._lock:
+                for id_board in stale:
+                    indexes[id_board] = TrigramIndex(rows[id_board])
+                    self._indexes[id_board] = (versions[id_board], indexes[id_board])
+                    self._indexes.move_to_end(id_board)
+                while len(self._indexes) > self.max_boards:
+                    self._indexes.popitem(last=False)
+        return indexes
+
+
+trigram_indexes = TrigramIndexCache()
+
+
+def _find_postgres(boards_id, query, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(_POSTGRES_SQL, [query, boards_id, query, query, limit])
+        rows = cursor.fetchall()
+    return [
+        {
+            'id': id_task,
+            'id_board': id_board,
+            'id_block': id_block,
+            'text': text,
+            'score': score,
+        }
+        for id_task, id_board, id_block, text, score in rows
+    ]
+
+
+def _find_in_memory(boards_id, query, limit):
+    query_grams = trigrams(query)
+    if not query_grams:
+        return []
+
+    matches = []
+    for id_board, index in trigram_indexes.get(boards_id).items():
+        for score, similarity, id_task in index.search(
+            query_grams, limit, FUZZY_THRESHOLD
+        ):
+            matches.append((score, similarity, id_task, id_board, index))
+
+    results = []
+    for score, similarity, id_task, id_board, index in heapq.nlargest(
+        limit, matches, key=lambda match: match[:3]
+    ):
+        id_block, text = index.tasks[-id_task]
+        results.append(
+            {
+                'id': -id_task,
+                'id_board': id_board,
+                'id_block': id_block,
+                'text': text,
+                'score': score,
+            }
+        )
+    return results
+
+
+def find_tasks(boards_id, query, limit=FUZZY_LIMIT):
+    if not boards_id or not query.strip():
+        return []
+
+    if connection.vendor == 'postgresql':
+        return _find_postgres(list(boards_id), query, limit)
+    return _find_in_memory(list(boards_id), query, limit)
@@ -0,0 +1,55 @@
+from managment.models import (
+    Block,
+    Board,
+    Comment,
+    StatusTask,
+    Task,
+    User,
+    UserBoard,
+    UserRole,
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+# Доски пользователя и задачи одного блока с комментариями, по rows штук.
+# Вызывается внутри транзакции, которая затем откатывается (Rollback).
+def create_benchmark_data(rows, username):
+    user = User.objects.create(username=username)
+    boards = Board.objects.bulk_create([Board(name=str(i)) for i in range(rows)])
+    roles = UserRole.objects.bulk_create(
+        [UserRole(name='role', id_board=board) for board in boards]
+    )
+    UserBoard.objects.bulk_create(
+        [
+            UserBoard(id_user=user, id_board=board, id_user_role=role)
+            for board, role in zip(boards, roles)
+        ]
+    )
+    board = boards[0]
+    block = Block.objects.create(name='block', id_board=board)
+    status_task = StatusTask.objects.create(name='status', id_board=board)
+    tasks = Task.objects.bulk_create(
+        [
+            Task(
+                text=str(i),
+                id_block=block,
+                id_status_task=status_task,
+                id_board=board,
+            )
+            for i in range(rows)
+        ]
+    )
+    Comment.objects.bulk_create(
+        [
+            Comment(id_user=user, id_task=task, id_board=board, text='c')
+            for task in tasks
+        ]
+    )
+
+    return (
+        Board.objects.filter(id__in=[b.id for b in boards]),
+        Task.objects.filter(id_block=block),
+    )
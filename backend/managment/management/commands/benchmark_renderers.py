@@ -0,0 +1,66 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from managment import renderers
+from managment.projections import serialize_rows
+from managment.serializers import BoardSerializer, TaskSerializer
+
+from ._benchmark_data import Rollback, create_benchmark_data
+
+
+# Сравнение JSONRenderer/JSONParser и FastJSONRenderer/FastJSONParser
+# на списках досок и задач. Данные создаются в транзакции и откатываются.
+class Command(BaseCommand):
+    help = 'Benchmark JSON rendering and parsing: DRF vs managment.renderers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            'backend: %s' % ('orjson' if renderers.orjson is not None else 'json')
+        )
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, repeat):
+        boards, tasks = create_benchmark_data(rows, 'benchmark_renderers')
+
+        cases = [
+            ('boards', serialize_rows(BoardSerializer, boards)),
+            ('tasks', serialize_rows(TaskSerializer, tasks)),
+        ]
+        for name, data in cases:
+            content = JSONRenderer().render(data)
+            if renderers.FastJSONRenderer().render(data) != content:
+                self.stderr.write('%s: rendered outputs differ' % name)
+
+            for label, func in (
+                ('JSONRenderer', lambda: JSONRenderer().render(data)),
+                ('FastJSONRenderer', lambda: renderers.FastJSONRenderer().render(data)),
+                ('JSONParser', lambda: JSONParser().parse(io.BytesIO(content))),
+                (
+                    'FastJSONParser',
+                    lambda: renderers.FastJSONParser().parse(io.BytesIO(content)),
+                ),
+            ):
+                best = min(self.measure(func) for _ in range(repeat))
+                self.stdout.write(
+                    '%-7s %-17s %8.2f ms total %8.2f us/row'
+                    % (name, label, best * 1000, best * 1e6 / rows)
+                )
+
+    def measure(self, func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
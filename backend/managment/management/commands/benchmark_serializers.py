@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from managment.projections import serialize_rows
+from managment.serializers import BoardSerializer, TaskSerializer
+
+from ._benchmark_data import Rollback, create_benchmark_data
+
+
+# Сравнение ModelSerializer(data=queryset).is_valid() и serialize_rows на списках
+# досок и задач. Данные создаются в транзакции и откатываются.
+class Command(BaseCommand):
+    help = 'Benchmark list serialization: ModelSerializer vs serialize_rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, repeat):
+        boards, tasks = create_benchmark_data(rows, 'benchmark_serializers')
+
+        cases = [
+            ('boards', BoardSerializer, boards),
+            ('tasks', TaskSerializer, tasks),
+        ]
+        for name, serializer_class, queryset in cases:
+
+            def model_serializer():
+                serializer = serializer_class(data=queryset.all(), many=True)
+                serializer.is_valid()
+                return serializer.data
+
+            def projection():
+                return serialize_rows(serializer_class, queryset.all())
+
+            if list(model_serializer()) != projection():
+                self.stderr.write('%s: outputs differ' % name)
+
+            for label, func in (
+                ('ModelSerializer', model_serializer),
+                ('serialize_rows', projection),
+            ):
+                best = min(self.measure(func) for _ in range(repeat))
+                self.stdout.write(
+                    '%-7s %-16s %8.2f ms total %8.2f us/row'
+                    % (name, label, best * 1000, best * 1e6 / rows)
+                )
+
+    def measure(self, func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from managment.boards import PURGE_CHUNK_SIZE, deleted_boards, purge_board
+
+
+# Очистка досок, удаленных через API (boards.delete_board): строки удаляются
+# частями по --chunk-size. Запускается по расписанию (cron).
+class Command(BaseCommand):
+    help = 'Delete rows of boards marked as deleted, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=PURGE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        boards = list(deleted_boards())
+        for id_board in boards:
+            deleted = purge_board(id_board, options['chunk_size'])
+            self.stdout.write('board %s: %s rows' % (id_board, deleted))
+        self.stdout.write('purged %s boards' % len(boards))
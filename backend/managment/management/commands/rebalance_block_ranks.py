@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from managment.moves import (
+    blocks_to_rebalance,
+    boards_to_rebalance,
+    rebalance_blocks,
+    rebalance_tasks,
+)
+from managment.ranks import REBALANCE_LENGTH
+
+
+# Выравнивание рангов (ranks.py): блоков в досках и задач в блоках,
+# где ранги стали длинными. Запускается по расписанию (cron),
+# переносы от него не зависят.
+class Command(BaseCommand):
+    help = 'Rebalance block and task ranks longer than --length'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--length', type=int, default=REBALANCE_LENGTH)
+
+    def handle(self, *args, **options):
+        boards = list(boards_to_rebalance(options['length']))
+        for id_board in boards:
+            changed = rebalance_blocks(id_board)
+            self.stdout.write('board %s: %s blocks' % (id_board, changed))
+
+        blocks = list(blocks_to_rebalance(options['length']))
+        for id_board, id_block in blocks:
+            changed = rebalance_tasks(id_board, id_block)
+            self.stdout.write('block %s: %s tasks' % (id_block, changed))
+
+        self.stdout.write(
+            'rebalanced %s boards, %s blocks' % (len(boards), len(blocks))
+        )
@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.db.models import OuterRef, Subquery
+
+from .models import UserBoard
+
+
+# Контекст участия пользователя в досках в рамках одного запроса.
+# Permission-классы и view обращаются к одной и той же записи UserBoard,
+# поэтому запрос к managment_userboard выполняется один раз на доску.
+class BoardMembership:
+    def __init__(self, user):
+        self.user = user
+        self._user_boards = {}
+
+    @classmethod
+    def for_request(cls, request):
+        # кэш храним на HttpRequest, чтобы его видели и DRF Request, и view
+        http_request = getattr(request, '_request', request)
+        membership = getattr(http_request, '_board_membership', None)
+
+        if membership is None or membership.user != request.user:
+            membership = cls(request.user)
+            http_request._board_membership = membership
+
+        return membership
+
+    def get(self, id_board):
+        id_board = normalize_id(id_board)
+        if id_board is None or not self.user.is_authenticated:
+            return None
+
+        if id_board not in self._user_boards:
+            board_claims = getattr(self.user, 'board_claims', None)
+            if board_claims is not None:
+                self._user_boards[id_board] = user_board_from_claim(
+                    self.user.id, id_board, board_claims.get(str(id_board))
+                )
+            else:
+                self._user_boards[id_board] = UserBoard.objects.filter(
+                    id_user=self.user.id, id_board=id_board
+                ).first()
+
+        return self._user_boards[id_board]
+
+    def prime(self, id_board, user_board):
+        self._user_boards[normalize_id(id_board)] = user_board
+
+
+# UserBoard из claims токена (authentication.py), маска роли берется из токена
+def user_board_from_claim(id_user, id_board, claim):
+    if claim is None:
+        return None
+
+    id_user_board, id_user_role, is_admin, role_mask = claim
+    user_board = UserBoard(
+        id=id_user_board,
+        id_user_id=id_user,
+        id_board_id=id_board,
+        id_user_role_id=id_user_role,
+        is_admin=is_admin,
+    )
+    user_board.role_mask = role_mask
+    return user_board
+
+
+# id может прийти объектом модели, строкой из формы или числом
+def normalize_id(value):
+    if isinstance(value, models.Model):
+        return value.pk
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_user_board(request, id_board):
+    return BoardMembership.for_request(request).get(id_board)
+
+
+# Участие пользователя в доске объекта одним запросом с самим объектом:
+# board_field - поле с доской (для Board это 'id')
+def annotate_membership(queryset, user, board_field):
+    user_boards = UserBoard.objects.filter(
+        id_user=user.id, id_board=OuterRef(board_field)
+    )
+    return queryset.annotate(
+        member_id=Subquery(user_boards.values('id')[:1]),
+        member_id_user_role=Subquery(user_boards.values('id_user_role')[:1]),
+        member_is_admin=Subquery(user_boards.values('is_admin')[:1]),
+    )
+
+
+# кладет в контекст запроса UserBoard, собранный из аннотаций annotate_membership
+def prime_membership(request, obj, id_board):
+    user_board = None
+    if obj.member_id is not None:
+        user_board = UserBoard(
+            id=obj.member_id,
+            id_user_id=request.user.id,
+            id_board_id=id_board,
+            id_user_role_id=obj.member_id_user_role,
+            is_admin=obj.member_is_admin,
+        )
+
+    BoardMembership.for_request(request).prime(id_board, user_board)
+
+
+# Индекс досок пользователя в кэше Django: {id_board: is_admin}.
+# Поддерживается сигналами UserBoard (см. signals.py).
+def user_boards_cache_key(id_user):
+    return 'managment:user_boards:%s' % id_user
+
+
+def get_user_boards_index(id_user):
+    key = user_boards_cache_key(id_user)
+    index = cache.get(key)
+
+    if index is None:
+        index = dict(
+            UserBoard.objects.filter(id_user=id_user).values_list(
+                'id_board', 'is_admin'
+            )
+        )
+        cache.set(key, index, settings.USER_BOARDS_CACHE_TIMEOUT)
+
+    return index
+
+
+def get_user_board_ids(id_user, is_admin=None):
+    index = get_user_boards_index(id_user)
+    if is_admin is None:
+        return list(index)
+
+    return [id_board for id_board, admin in index.items() if admin == is_admin]
+
+
+def invalidate_user_boards(*users_id):
+    cache.delete_many([user_boards_cache_key(id_user) for id_user in users_id])
@@ -0,0 +1,75 @@
+# Generated by Django 5.0.3 on 2026-10-17 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_id_board(apps, schema_editor):
+    Block = apps.get_model('managment', 'Block')
+    Task = apps.get_model('managment', 'Task')
+    Comment = apps.get_model('managment', 'Comment')
+
+    Task.objects.update(
+        id_board=Subquery(
+            Block.objects.filter(id=OuterRef('id_block')).values('id_board')[:1]
+        )
+    )
+    Comment.objects.update(
+        id_board=Subquery(
+            Task.objects.filter(id=OuterRef('id_task')).values('id_board')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managment', '0017_remove_userrole_creating_comment_alter_task_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='id_board',
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='tasks',
+                to='managment.board',
+            ),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='id_board',
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='comments',
+                to='managment.board',
+            ),
+        ),
+        migrations.RunPython(backfill_id_board, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='task',
+            name='id_board',
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='tasks',
+                to='managment.board',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='id_board',
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='comments',
+                to='managment.board',
+            ),
+        ),
+    ]
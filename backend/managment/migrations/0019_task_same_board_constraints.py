@@ -0,0 +1,39 @@
+# Generated by Django 5.0.3 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+from managment.db_constraints import (
+    install_same_board_constraints,
+    uninstall_same_board_constraints,
+)
+
+
+def install(apps, schema_editor):
+    install_same_board_constraints(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    uninstall_same_board_constraints(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managment', '0018_task_id_board_comment_id_board'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='block',
+            constraint=models.UniqueConstraint(
+                fields=('id', 'id_board'), name='block_id_board_unique'
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='statustask',
+            constraint=models.UniqueConstraint(
+                fields=('id', 'id_board'), name='status_task_id_board_unique'
+            ),
+        ),
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.3 on 2026-10-17 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managment', '0019_task_same_board_constraints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='block',
+            index=models.Index(fields=['id_board', 'id'], name='block_board_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['id_board', 'id'], name='comment_board_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['id_task', 'id'], name='comment_task_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['id_user', 'id'], name='comment_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statustask',
+            index=models.Index(
+                fields=['id_board', 'id'], name='status_task_board_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['id_board', 'id'], name='task_board_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['id_block', 'id'], name='task_block_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userboard',
+            index=models.Index(
+                fields=['id_board', 'id'], name='user_board_board_id_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='userrole',
+            index=models.Index(
+                fields=['id_board', 'id'], name='user_role_board_id_idx'
+            ),
+        ),
+    ]
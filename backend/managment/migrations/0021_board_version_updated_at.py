@@ -0,0 +1,37 @@
+# Generated by Django 5.0.3 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+from managment.db_constraints import create_sqlite_triggers, drop_sqlite_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managment', '0020_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_triggers, create_sqlite_triggers),
+        migrations.AddField(
+            model_name='block',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(create_sqlite_triggers, drop_sqlite_triggers),
+    ]
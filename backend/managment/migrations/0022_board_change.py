@@ -0,0 +1,49 @@
+# Generated by Django 5.0.3 on 2026-10-17 17:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managment', '0021_board_version_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('seq', models.PositiveBigIntegerField()),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.IntegerField()),
+                (
+                    'action',
+                    models.CharField(
+                        choices=[
+                            ('insert', 'insert'),
+                            ('update', 'update'),
+                            ('delete', 'delete'),
+                        ],
+                        max_length=6,
+                    ),
+                ),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                (
+                    'id_board',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='changes',
+                        to='managment.board',
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='boardchange',
+            constraint=models.UniqueConstraint(
+                fields=('id_board', 'seq'), name='board_change_seq_unique'
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:05
+
+from django.db import migrations, models
+from django.db.models import F
+
+from managment.db_constraints import create_sqlite_triggers, drop_sqlite_triggers
+from managment.ranks import spread_ranks
+
+
+# существующие блоки получают ранги в прежнем порядке: position, затем id
+def fill_block_ranks(apps, schema_editor):
+    Block = apps.get_model('managment', 'Block')
+    boards = Block.objects.values_list('id_board', flat=True).distinct()
+    for id_board in boards:
+        blocks = list(
+            Block.objects.filter(id_board=id_board).order_by(
+                F('position').asc(nulls_last=True), 'id'
+            )
+        )
+        for block, rank in zip(blocks, spread_ranks(len(blocks))):
+            block.rank = rank
+        Block.objects.bulk_update(blocks, ['rank'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managment', '0022_board_change'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_triggers, create_sqlite_triggers),
+        migrations.AddField(
+            model_name='block',
+            name='rank',
+            field=models.CharField(default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_block_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='block',
+            index=models.Index(
+                fields=['id_board', 'rank'], name='block_board_rank_idx'
+            ),
+        ),
+        migrations.RunPython(create_sqlite_triggers, drop_sqlite_triggers),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+from managment.db_constraints import create_sqlite_triggers, drop_sqlite_triggers
+from managment.ranks import spread_ranks
+
+
+# существующие задачи получают ранги в порядке id внутри блока
+def fill_task_ranks(apps, schema_editor):
+    Task = apps.get_model('managment', 'Task')
+    blocks = Task.objects.values_list('id_block', flat=True).distinct()
+    for id_block in blocks:
+        tasks = list(Task.objects.filter(id_block=id_block).order_by('id'))
+        for task, rank in zip(tasks, spread_ranks(len(tasks))):
+            task.rank = rank
+        Task.objects.bulk_update(tasks, ['rank'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managment', '0023_block_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_triggers, create_sqlite_triggers),
+        migrations.AddField(
+            model_name='task',
+            name='rank',
+            field=models.CharField(default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_task_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['id_block', 'rank'], name='task_block_rank_idx'),
+        ),
+        migrations.RunPython(create_sqlite_triggers, drop_sqlite_triggers),
+    ]
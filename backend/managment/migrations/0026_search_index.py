@@ -0,0 +1,24 @@
+# Generated by Django 5.0.3 on 2026-10-17 19:40
+
+from django.db import migrations
+
+from managment.search_index import install_search_index, uninstall_search_index
+
+
+def install(apps, schema_editor):
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managment', '0025_board_deleted_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-17 20:30
+
+from django.db import migrations
+
+
+# GIN-индекс триграмм для нечеткого поиска задач (fuzzy.py);
+# в других БД поиск идет по индексу в памяти, миграция ничего не делает
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS managment_task_text_trgm_idx '
+        'ON managment_task USING gin (text gin_trgm_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS managment_task_text_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managment', '0026_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
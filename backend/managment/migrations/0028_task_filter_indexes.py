@@ -0,0 +1,25 @@
+# Generated by Django 5.0.3 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managment', '0027_task_text_trigram'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(
+                fields=['id_board', 'date', 'id'], name='task_board_date_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(
+                fields=['id_status_task', 'date', 'id'], name='task_status_date_idx'
+            ),
+        ),
+    ]
@@ -3,6 +3,8 @@ import datetime
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 
+from .ranks import RANK_MAX_LENGTH, rank_between
+
 
 class User(AbstractUser):
     id = models.AutoField(primary_key=True)
@@ -16,6 +18,8 @@ class User(AbstractUser):
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(null=True)
+    # эпоха claims токена (authentication.py), растет при смене участия и ролей
+    token_epoch = models.PositiveIntegerField(default=0, editable=False)
 
 
 class Block(models.Model):
@@ -25,11 +29,52 @@ class Block(models.Model):
     )
     name = models.CharField(max_length=30)
     position = models.IntegerField(blank=True, null=True)
+    # порядок блоков в доске (ranks.py), меняется действием move
+    rank = models.CharField(max_length=RANK_MAX_LENGTH, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # цель составного внешнего ключа задачи (id_block, id_board)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['id', 'id_board'], name='block_id_board_unique'
+            ),
+        ]
+        # постраничные списки: фильтр по доске и порядок по id или по рангу
+        indexes = [
+            models.Index(fields=['id_board', 'id'], name='block_board_id_idx'),
+            models.Index(fields=['id_board', 'rank'], name='block_board_rank_idx'),
+        ]
+
+    # новый блок встает в конец доски
+    def save(self, *args, **kwargs):
+        if not self.rank:
+            last = Block.objects.filter(id_board=self.id_board_id).aggregate(
+                rank=models.Max('rank')
+            )
+            self.rank = rank_between(last['rank'], None)
+        super().save(*args, **kwargs)
 
 
 class Board(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=20)
+    # растет при любом изменении доски и ее объектов (versions.py), по ней ETag
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # удаленная доска: скрыта сразу, строки удаляются позже (boards.purge_board)
+    deleted_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    # версию меняет только bump_board_version, отметку удаления - delete_board,
+    # сохранение доски их не перезаписывает
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('version', 'deleted_at')
+            ]
+        super().save(*args, **kwargs)
 
 
 class Comment(models.Model):
@@ -42,6 +87,22 @@ class Comment(models.Model):
     id_task = models.ForeignKey(
         "Task", related_name='comments', on_delete=models.CASCADE
     )
+    # копия id_task.id_board для проверки доступа без обхода задачи и блока
+    id_board = models.ForeignKey(
+        'Board', related_name='comments', on_delete=models.CASCADE, editable=False
+    )
+
+    class Meta:
+        # постраничные списки: фильтр и порядок по id
+        indexes = [
+            models.Index(fields=['id_board', 'id'], name='comment_board_id_idx'),
+            models.Index(fields=['id_task', 'id'], name='comment_task_id_idx'),
+            models.Index(fields=['id_user', 'id'], name='comment_user_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.id_board_id = self.id_task.id_board_id
+        super().save(*args, **kwargs)
 
 
 class StatusTask(models.Model):
@@ -51,6 +112,17 @@ class StatusTask(models.Model):
         Board, related_name='status_tasks', on_delete=models.CASCADE
     )
 
+    class Meta:
+        # цель составного внешнего ключа задачи (id_status_task, id_board)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['id', 'id_board'], name='status_task_id_board_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['id_board', 'id'], name='status_task_board_id_idx')
+        ]
+
 
 class Task(models.Model):
     id = models.AutoField(primary_key=True)
@@ -63,6 +135,39 @@ class Task(models.Model):
     text = models.CharField(max_length=50)
     description = models.CharField(max_length=300, blank=True, null=True)
     date = models.DateField(default=datetime.date.today())
+    # порядок задач в блоке (ranks.py), меняется действием move
+    rank = models.CharField(max_length=RANK_MAX_LENGTH, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # копия id_block.id_board для проверки доступа без обхода блока
+    id_board = models.ForeignKey(
+        'Board', related_name='tasks', on_delete=models.CASCADE, editable=False
+    )
+
+    class Meta:
+        # постраничные списки: фильтр и порядок по id,
+        # фильтры по статусу и датам (filters.py)
+        indexes = [
+            models.Index(fields=['id_board', 'id'], name='task_board_id_idx'),
+            models.Index(fields=['id_block', 'id'], name='task_block_id_idx'),
+            models.Index(fields=['id_block', 'rank'], name='task_block_rank_idx'),
+            models.Index(fields=['id_board', 'date', 'id'], name='task_board_date_idx'),
+            models.Index(
+                fields=['id_status_task', 'date', 'id'], name='task_status_date_idx'
+            ),
+        ]
+
+    # доска задается при создании и дальше не меняется: блок и статус
+    # задачи обязаны быть из этой доски, это проверяет БД (db_constraints.py)
+    def save(self, *args, **kwargs):
+        if self.id_board_id is None:
+            self.id_board_id = self.id_block.id_board_id
+        # новая задача встает в конец блока
+        if not self.rank:
+            last = Task.objects.filter(id_block=self.id_block_id).aggregate(
+                rank=models.Max('rank')
+            )
+            self.rank = rank_between(last['rank'], None)
+        super().save(*args, **kwargs)
 
 
 class UserRole(models.Model):
@@ -100,6 +205,12 @@ class UserRole(models.Model):
     editing_role = models.BooleanField(default=False)
     deleting_role = models.BooleanField(default=False)
 
+    class Meta:
+        # постраничные списки: фильтр по доске и порядок по id
+        indexes = [
+            models.Index(fields=['id_board', 'id'], name='user_role_board_id_idx')
+        ]
+
 
 class UserBoard(models.Model):
     id = models.AutoField(primary_key=True)
@@ -109,3 +220,35 @@ class UserBoard(models.Model):
         UserRole, related_name='roles', on_delete=models.CASCADE
     )
     is_admin = models.BooleanField(default=False, null=True)
+
+    class Meta:
+        # постраничные списки: фильтр по доске и порядок по id
+        indexes = [
+            models.Index(fields=['id_board', 'id'], name='user_board_board_id_idx')
+        ]
+
+
+# Журнал изменений доски (changes.py). seq - значение Board.version
+# после изменения, растет внутри доски.
+class BoardChange(models.Model):
+    INSERT = 'insert'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ACTIONS = ((INSERT, 'insert'), (UPDATE, 'update'), (DELETE, 'delete'))
+
+    id = models.BigAutoField(primary_key=True)
+    id_board = models.ForeignKey(
+        Board, related_name='changes', on_delete=models.CASCADE
+    )
+    seq = models.PositiveBigIntegerField()
+    model = models.CharField(max_length=20)
+    object_id = models.IntegerField()
+    action = models.CharField(max_length=6, choices=ACTIONS)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['id_board', 'seq'], name='board_change_seq_unique'
+            ),
+        ]
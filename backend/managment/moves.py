@@ -0,0 +1,146 @@
+from django.db import connection, transaction
+from django.db.models.functions import Length
+from rest_framework.exceptions import ValidationError
+
+from .models import Block, BoardChange, Task
+from .ranks import RANK_MAX_LENGTH, REBALANCE_LENGTH, rank_between, spread_ranks
+from .versions import record_board_changes
+
+# Перенос блоков в доске и задач между блоками по рангу (ranks.py):
+# пишется только переносимая строка. Соседи задаются id: after - объект
+# перед новым местом, before - после него. Хватает одного соседа, второй
+# читается из списка; без соседей - в конец списка.
+# Переносы в одной доске выполняются по очереди (lock_board), поэтому
+# два переноса в одно место не получают одинаковый ранг.
+
+# первый ключ pg_advisory_xact_lock, отделяет блокировки досок от других
+BOARD_LOCK_NAMESPACE = 1
+
+
+# блокировка до конца транзакции; в SQLite записи и так идут по очереди
+def lock_board(id_board):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, %s)', [BOARD_LOCK_NAMESPACE, id_board]
+            )
+
+
+# siblings - список, в который переносится obj
+def _neighbour_ranks(siblings, obj, after, before):
+    ids = {id_obj for id_obj in (after, before) if id_obj is not None}
+    if obj.id in ids:
+        raise ValidationError('object cannot be its own neighbour')
+
+    neighbours = dict(siblings.filter(id__in=ids).values_list('id', 'rank'))
+    if len(neighbours) != len(ids):
+        raise ValidationError('neighbours must be in the target list')
+
+    others = siblings.exclude(id=obj.id)
+    after_rank = neighbours.get(after)
+    before_rank = neighbours.get(before)
+
+    if after is None and before is None:
+        after_rank = others.order_by('-rank', '-id').values_list('rank', flat=True)
+        after_rank = after_rank.first()
+    elif before is None:
+        before_rank = others.filter(rank__gt=after_rank).order_by('rank', 'id')
+        before_rank = before_rank.values_list('rank', flat=True).first()
+    elif after is None:
+        after_rank = others.filter(rank__lt=before_rank).order_by('-rank', '-id')
+        after_rank = after_rank.values_list('rank', flat=True).first()
+
+    if after_rank is not None and before_rank is not None:
+        if after_rank >= before_rank:
+            raise ValidationError('after must precede before')
+    return after_rank, before_rank
+
+
+def _new_rank(siblings, obj, after, before, rebalance):
+    rank = rank_between(*_neighbour_ranks(siblings, obj, after, before))
+
+    # ранг не помещается в поле: список выравнивается сразу
+    if len(rank) > RANK_MAX_LENGTH:
+        rebalance()
+        rank = rank_between(*_neighbour_ranks(siblings, obj, after, before))
+    return rank
+
+
+# вызывать внутри transaction.atomic()
+def move_block(block, after=None, before=None):
+    lock_board(block.id_board_id)
+    siblings = Block.objects.filter(id_board=block.id_board_id)
+    block.rank = _new_rank(
+        siblings, block, after, before, lambda: rebalance_blocks(block.id_board_id)
+    )
+    block.save(update_fields=['rank', 'updated_at'])
+    return block
+
+
+# блок, статус и место задачи меняются одним UPDATE. Блок и статус из чужой
+# доски отклоняет БД (db_constraints.py), вызывать внутри transaction.atomic()
+def move_task(task, id_block=None, id_status_task=None, after=None, before=None):
+    lock_board(task.id_board_id)
+    if id_block is not None:
+        task.id_block_id = id_block
+    if id_status_task is not None:
+        task.id_status_task_id = id_status_task
+
+    siblings = Task.objects.filter(id_block=task.id_block_id)
+    task.rank = _new_rank(
+        siblings,
+        task,
+        after,
+        before,
+        lambda: rebalance_tasks(task.id_board_id, task.id_block_id),
+    )
+    task.save(update_fields=['id_block', 'id_status_task', 'rank', 'updated_at'])
+    return task
+
+
+# заново расставляет ранги списка, порядок сохраняется
+def _rebalance(siblings, id_board, model):
+    with transaction.atomic():
+        lock_board(id_board)
+        objects = list(siblings.order_by('rank', 'id').only('id', 'rank'))
+        changed = []
+        for obj, rank in zip(objects, spread_ranks(len(objects))):
+            if obj.rank != rank:
+                obj.rank = rank
+                changed.append(obj)
+
+        # bulk_update не вызывает сигналы, журнал пишется здесь
+        siblings.model.objects.bulk_update(changed, ['rank'])
+        record_board_changes(
+            id_board, model, [obj.id for obj in changed], BoardChange.UPDATE
+        )
+    return len(changed)
+
+
+def rebalance_blocks(id_board):
+    return _rebalance(Block.objects.filter(id_board=id_board), id_board, 'block')
+
+
+def rebalance_tasks(id_board, id_block):
+    return _rebalance(Task.objects.filter(id_block=id_block), id_board, 'task')
+
+
+def boards_to_rebalance(length=REBALANCE_LENGTH):
+    return (
+        Block.objects.annotate(rank_length=Length('rank'))
+        .filter(rank_length__gt=length)
+        .values_list('id_board', flat=True)
+        .distinct()
+        .order_by()
+    )
+
+
+# пары (id_board, id_block)
+def blocks_to_rebalance(length=REBALANCE_LENGTH):
+    return (
+        Task.objects.annotate(rank_length=Length('rank'))
+        .filter(rank_length__gt=length)
+        .values_list('id_board', 'id_block')
+        .distinct()
+        .order_by()
+    )
@@ -0,0 +1,84 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+from .projections import serialize_rows
+
+
+# Постраничный вывод по ключу (keyset): страница начинается после последней
+# строки предыдущей, поэтому дальние страницы стоят столько же, сколько первая.
+# Тело ответа остается списком, ссылка на следующую страницу - в заголовке Link.
+# Поля ordering должны быть в выдаче сериализатора; '-поле' - по убыванию.
+class KeysetPagination:
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def __init__(self, ordering=('id',)):
+        self.ordering = tuple(ordering)
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+
+    def get_page_size(self, request):
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        value = request.query_params.get(self.page_size_query_param)
+        if value is not None:
+            try:
+                page_size = int(value)
+            except ValueError:
+                pass
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, values):
+        raw = json.dumps(list(values), separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+        except (ValueError, TypeError):
+            raise NotFound('Invalid cursor')
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+        return values
+
+    # (a, b) > (va, vb)  ->  a > va OR (a = va AND b > vb), для '-a' - a < va
+    def after(self, values):
+        condition = Q()
+        equal = Q()
+        for order, field, value in zip(self.ordering, self.fields, values):
+            lookup = '__lt' if order.startswith('-') else '__gt'
+            condition |= equal & Q(**{field + lookup: value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def paginate_rows(self, request, serializer_class, queryset, fields=None):
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(cursor))
+
+        # одна лишняя строка показывает, есть ли следующая страница
+        items = serialize_rows(serializer_class, queryset[: page_size + 1], fields)
+
+        headers = {}
+        if len(items) > page_size:
+            items = items[:page_size]
+            url = replace_query_param(
+                request.build_absolute_uri(),
+                self.cursor_query_param,
+                self.encode_cursor(items[-1][field] for field in self.fields),
+            )
+            headers['Link'] = '<%s>; rel="next"' % url
+        return items, headers
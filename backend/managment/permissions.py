@@ -14,7 +14,9 @@ from django.utils.autoreload import request_finished
 from django.utils.encoding import repercent_broken_unicode
 from rest_framework import permissions
 
+from .membership import get_user_board
 from .models import Block, Board, Comment, StatusTask, Task, User, UserBoard, UserRole
+from .roles import RolePermission, role_can
 
 
 class ReadOnly(permissions.BasePermission):
@@ -82,22 +84,18 @@ class IsUserRelateToBoardOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        user_board = (
-            UserBoard.objects.select_related('id_user_role')
-            .filter(id_user=request.user, id_board=obj.id)
-            .first()
-        )
+        user_board = get_user_board(request, obj.id)
         if user_board:
             if user_board.is_admin:
                 return True
 
             if request.method == 'DELETE':
-                if user_board.id_user_role.deleting_board:
+                if role_can(user_board, RolePermission.DELETING_BOARD):
                     return True
                 return False
 
             if request.method == 'PATCH' or request.method == 'PUT':
-                if user_board.id_user_role.editing_board:
+                if role_can(user_board, RolePermission.EDITING_BOARD):
                     return True
                 return False
 
@@ -105,11 +103,7 @@ class IsUserRelateToBoardOrReadOnly(permissions.BasePermission):
 class IsUserRelateToBlockOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method == 'POST':
-            user_board = (
-                UserBoard.objects.select_related('id_user_role')
-                .filter(id_user=request.user.id, id_board=request.data['id_board'])
-                .first()
-            )
+            user_board = get_user_board(request, request.data.get('id_board'))
 
             if not user_board:
                 return False
@@ -117,7 +111,7 @@ class IsUserRelateToBlockOrReadOnly(permissions.BasePermission):
             if user_board.is_admin:
                 return True
 
-            if user_board.id_user_role.creating_block:
+            if role_can(user_board, RolePermission.CREATING_BLOCK):
                 return True
 
             return False
@@ -135,11 +129,7 @@ class IsUserRelateToBlockOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        user_board = (
-            UserBoard.objects.select_related('id_user_role')
-            .filter(id_user=request.user, id_board=obj.id_board)
-            .first()
-        )
+        user_board = get_user_board(request, obj.id_board_id)
 
         if user_board:
 
@@ -150,12 +140,12 @@ class IsUserRelateToBlockOrReadOnly(permissions.BasePermission):
                 return True
 
             if request.method == 'DELETE':
-                if user_board.id_user_role.deleting_block:
+                if role_can(user_board, RolePermission.DELETING_BLOCK):
                     return True
                 return False
 
             if request.method == 'PATCH':
-                if user_board.id_user_role.editing_block:
+                if role_can(user_board, RolePermission.EDITING_BLOCK):
                     if 'id_board' not in request.data:
                         return True
                 return False
@@ -173,18 +163,20 @@ class IsOwnerCommentOrRole(permissions.BasePermission):
                 and request.user.id
                 == User.objects.get(id=request.data.get('id_user')).id
             ):
-                task = Task.objects.get(id=request.data.get('id_task'))
+                id_board = (
+                    Task.objects.filter(id=request.data.get('id_task'))
+                    .values_list('id_board', flat=True)
+                    .first()
+                )
 
-                user_board = UserBoard.objects.filter(
-                    id_user=request.user.id, id_board=task.id_block.id_board.id
-                ).first()
+                user_board = get_user_board(request, id_board)
 
                 if not user_board:
                     return False
 
                 if user_board.is_admin:
                     return True
-                if user_board.id_user_role.commenting:
+                if role_can(user_board, RolePermission.COMMENTING):
                     return True
 
             return False
@@ -205,30 +197,26 @@ class IsOwnerCommentOrRole(permissions.BasePermission):
         if request.method == 'PUT':
             return False
 
-        user_board = (
-            UserBoard.objects.select_related('id_user_role')
-            .filter(id_user=request.user.id, id_board=obj.id_task.id_block.id_board.id)
-            .first()
-        )
+        user_board = get_user_board(request, obj.id_board_id)
 
         if not user_board:
             return False
 
-        if request.method == 'PATCH' and request.user == obj.id_user:
+        if request.method == 'PATCH' and obj.id_user_id == request.user.id:
             if user_board.is_admin:
                 return True
-            if user_board.id_user_role.editing_ur_comment:
+            if role_can(user_board, RolePermission.EDITING_UR_COMMENT):
                 return True
 
             return False
 
         if request.method == 'DELETE':
-            if user_board.id_user_role.deleting_all_comment:
+            if role_can(user_board, RolePermission.DELETING_ALL_COMMENT):
                 return True
             if user_board.is_admin:
                 return True
-            if request.user == obj.id_user:
-                if user_board.id_user_role.deleting_ur_comment:
+            if obj.id_user_id == request.user.id:
+                if role_can(user_board, RolePermission.DELETING_UR_COMMENT):
                     return True
 
             return False
@@ -241,35 +229,25 @@ class IsOwnerCommentOrRole(permissions.BasePermission):
 class IsUserRelateToTaskOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method == 'POST':
-            block = (
-                Block.objects.select_related('id_board')
-                .filter(id=request.data.get('id_block'))
+            id_board = (
+                Block.objects.filter(id=request.data.get('id_block'))
+                .values_list('id_board', flat=True)
                 .first()
             )
-            if not block:
+            if not id_board:
                 return False
 
-            user_board = (
-                UserBoard.objects.select_related('id_user_role')
-                .filter(id_user=request.user.id, id_board=block.id_board.id)
-                .first()
-            )
+            user_board = get_user_board(request, id_board)
 
             if not user_board:
                 return False
 
-            status_task = (
-                StatusTask.objects.select_related('id_board')
-                .filter(id=request.data.get('id_status_task'))
-                .first()
-            )
-            if status_task.id_board == block.id_board:
-
-                if user_board.is_admin:
-                    return True
+            # принадлежность статуса доске блока проверяет БД при вставке
+            if user_board.is_admin:
+                return True
 
-                if user_board.id_user_role.creating_task:
-                    return True
+            if role_can(user_board, RolePermission.CREATING_TASK):
+                return True
 
             return False
 
@@ -286,81 +264,21 @@ class IsUserRelateToTaskOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        user_board = (
-            UserBoard.objects.select_related('id_user_role')
-            .filter(id_user=request.user.id, id_board=obj.id_block.id_board.id)
-            .first()
-        )
+        user_board = get_user_board(request, obj.id_board_id)
 
         if not user_board:
             return False
 
+        # новые id_block и id_status_task должны быть из доски задачи,
+        # это проверяет БД тем же UPDATE (см. db_constraints.py)
         if request.method == 'PUT' or request.method == 'PATCH':
-            if 'id_block' not in request.data and 'id_status_task' not in request.data:
-                if user_board.id_user_role.editing_task:
-                    return True
-                if user_board.is_admin:
-                    return True
-            if 'id_block' in request.data and 'id_status_task' in request.data:
-                block_check = (
-                    Block.objects.select_related('id_board')
-                    .filter(id=request.data.get('id_block'))
-                    .first()
-                )
-                status_check = (
-                    StatusTask.objects.select_related('id_board')
-                    .filter(id=request.data.get('id_status_task'))
-                    .first()
-                )
-
-                if (
-                    block_check.id_board == obj.id_block.id_board
-                    and status_check.id_board == obj.id_status_task.id_board
-                ):
-                    if user_board.id_user_role.editing_task:
-                        return True
-                    if user_board.is_admin:
-                        return True
-
-            if 'id_block' not in request.data and 'id_status_task' not in request.data:
-                if user_board.id_user_role.editing_task:
-                    return True
-                if user_board.is_admin:
-                    return True
-
-            if 'id_block' not in request.data:
-                status_check = (
-                    StatusTask.objects.select_related('id_board')
-                    .filter(id=request.data.get('id_status_task'))
-                    .first()
-                )
-
-                if not status_check:
-                    return False
-
-                if status_check.id_board == obj.id_status_task.id_board:
-                    if user_board.id_user_role.editing_task:
-                        return True
-                    if user_board.is_admin:
-                        return True
-
-            if 'id_status_task' not in request.data:
-                block_check = (
-                    Block.objects.select_related('id_board')
-                    .filter(id=request.data.get('id_block'))
-                    .first()
-                )
-                if not block_check:
-                    return False
-
-                if block_check.id_board == obj.id_block.id_board:
-                    if user_board.id_user_role.editing_task:
-                        return True
-                    if user_board.is_admin:
-                        return True
+            if role_can(user_board, RolePermission.EDITING_TASK):
+                return True
+            if user_board.is_admin:
+                return True
 
         if request.method == 'DELETE':
-            if user_board.id_user_role.deleting_task:
+            if role_can(user_board, RolePermission.DELETING_TASK):
                 return True
             if user_board.is_admin:
                 return True
@@ -384,16 +302,14 @@ class IsUserRoleCanCRUDUserRole(permissions.BasePermission):
             if request.user.is_authenticated:
                 return True
 
-        user_board = UserBoard.objects.select_related('id_user_role').get(
-            id_board=request.data.get("id_board"), id_user=request.user.id
-        )
+        user_board = get_user_board(request, request.data.get("id_board"))
         if not user_board:
             return False
 
         if request.method == "POST" and request.user.is_authenticated:
             if user_board.is_admin:
                 return True
-            if user_board.id_user_role.creating_role:
+            if role_can(user_board, RolePermission.CREATING_ROLE):
                 return True
 
     def has_object_permission(self, request, view, obj):
@@ -407,11 +323,7 @@ class IsUserRoleCanCRUDUserRole(permissions.BasePermission):
             if request.method == 'GET':
                 return True
 
-            user_board = (
-                UserBoard.objects.select_related("id_user_role")
-                .filter(id_board=obj.id_board, id_user=user.id)
-                .first()
-            )
+            user_board = get_user_board(request, obj.id_board_id)
 
             if not user_board:
                 return False
@@ -420,20 +332,20 @@ class IsUserRoleCanCRUDUserRole(permissions.BasePermission):
                 return True
 
             if request.method == "DELETE":
-                if user_board.id_user_role.deleting_role:
+                if role_can(user_board, RolePermission.DELETING_ROLE):
                     return True
 
             if 'id_board' not in request.data and request.method == 'PATCH':
-                if user_board.id_user_role.editing_role:
+                if role_can(user_board, RolePermission.EDITING_ROLE):
                     return True
 
-            if request.data.get('id_board') == user_board.id_board.id:
+            if request.data.get('id_board') == user_board.id_board_id:
                 if request.method == "PUT":
-                    if user_board.id_user_role.editing_role:
+                    if role_can(user_board, RolePermission.EDITING_ROLE):
                         return True
 
                 if request.method == "PATCH":
-                    if user_board.id_user_role.editing_role:
+                    if role_can(user_board, RolePermission.EDITING_ROLE):
                         return True
 
 
@@ -443,16 +355,12 @@ class IsUserRoleCanCRUDUserRole(permissions.BasePermission):
 class IsUserRoleCanCRUDStatusTask(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method == 'POST':
-            user_board = (
-                UserBoard.objects.select_related('id_user_role')
-                .filter(id_user=request.user.id, id_board=request.data.get('id_board'))
-                .first()
-            )
+            user_board = get_user_board(request, request.data.get('id_board'))
 
             if user_board:
                 if user_board.is_admin:
                     return True
-                if user_board.id_user_role.creating_status_task:
+                if role_can(user_board, RolePermission.CREATING_STATUS_TASK):
                     return True
                 return False
             else:
@@ -471,11 +379,7 @@ class IsUserRoleCanCRUDStatusTask(permissions.BasePermission):
         if request.method == 'GET':
             return True
 
-        user_board = (
-            UserBoard.objects.select_related('id_user_role')
-            .filter(id_user=request.user.id, id_board=obj.id_board.id)
-            .first()
-        )
+        user_board = get_user_board(request, obj.id_board_id)
 
         if user_board:
             if request.method == 'PUT':
@@ -484,10 +388,10 @@ class IsUserRoleCanCRUDStatusTask(permissions.BasePermission):
                 return True
 
             if request.method == 'DELETE':
-                if user_board.id_user_role.deleting_status_task:
+                if role_can(user_board, RolePermission.DELETING_STATUS_TASK):
                     return True
             if request.method == 'PATCH':
-                if user_board.id_user_role.editing_status_task:
+                if role_can(user_board, RolePermission.EDITING_STATUS_TASK):
                     if 'id_board' not in request.data:
                         return True
 
@@ -511,14 +415,7 @@ class IsUserOrUserRoleCanEditDelete(permissions.BasePermission):
                     return False
 
                 # проверка есть ли у пользователя роль в этой доске и имеет ли он разрешение на добавление участников
-                user_board = (
-                    view.queryset.select_related('id_user_role')
-                    .filter(
-                        id_user=request.user.id,
-                        id_board=request.data.get('id_board'),
-                    )
-                    .first()
-                )
+                user_board = get_user_board(request, request.data.get('id_board'))
                 if not user_board:
                     return False
 
@@ -526,13 +423,13 @@ class IsUserOrUserRoleCanEditDelete(permissions.BasePermission):
                     return True
 
                 # проверка имеет ли пользователь разрешение на добавление и одинаковые ли доски указаны в роли и в юзер борде
-                if user_board.id_user_role.add_members:
+                if role_can(user_board, RolePermission.ADD_MEMBERS):
                     role = UserRole.objects.get(id=request.data.get('id_user_role'))
 
                     if not role:
                         return False
 
-                    if user_board.id_board == role.id_board:
+                    if user_board.id_board_id == role.id_board_id:
                         return True
             return False
 
@@ -540,7 +437,7 @@ class IsUserOrUserRoleCanEditDelete(permissions.BasePermission):
             return True
 
     def has_object_permission(self, request, view, obj):
-        if request.user == obj.id_user and obj.is_admin == True:
+        if obj.id_user_id == request.user.id and obj.is_admin == True:
             return True
         if request.user.is_superuser:
             return True
@@ -549,11 +446,7 @@ class IsUserOrUserRoleCanEditDelete(permissions.BasePermission):
             if request.method == permissions.SAFE_METHODS:
                 return True
 
-            user_board = (
-                view.queryset.select_related('id_user_role')
-                .filter(id_user=request.user.id, id_board=obj.id_board)
-                .first()
-            )
+            user_board = get_user_board(request, obj.id_board_id)
             if user_board:
                 if request.method == 'PUT':  # не разрешен
                     return False
@@ -567,12 +460,12 @@ class IsUserOrUserRoleCanEditDelete(permissions.BasePermission):
                         and 'is_admin' not in request.data
                     ):
                         # проверка на одинаковые id_board
-                        if user_board.id_user_role.edit_members:
-                            if user_board.id_board == obj.id_user_role.id_board:
+                        if role_can(user_board, RolePermission.EDIT_MEMBERS):
+                            if user_board.id_board_id == obj.id_user_role.id_board_id:
                                 return True
 
                 if request.method == 'DELETE':
-                    if user_board.id_user_role.delete_members:
+                    if role_can(user_board, RolePermission.DELETE_MEMBERS):
                         return True
-                    if request.user == obj.id_user:
+                    if obj.id_user_id == request.user.id:
                         return True
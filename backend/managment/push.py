@@ -0,0 +1,150 @@
+import asyncio
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .authentication import MembershipJWTAuthentication
+from .events import get_broker
+from .membership import get_user_board_ids
+from .renderers import dumps
+
+# Push-канал доски (только под ASGI, asgi.py):
+#   SSE        GET /api/boards/<id>/events/?token=<access>
+#   WebSocket  /ws/boards/<id>/?token=<access>
+# Сообщение - {board, seq, changes}, не чаще раза в BOARD_EVENTS_TICK.
+# Полные данные клиент берет из /api/boards/<id>/changes/?since=<seq>.
+# Токен и участие в доске проверяются при подключении и после каждого
+# сообщения или heartbeat: исключенный из доски или с истекшим токеном
+# получает закрытие канала.
+
+WEBSOCKET_PATH = re.compile(r'^/ws/boards/(?P<pk>\d+)/$')
+
+
+# токен из ?token= (EventSource и WebSocket в браузере не задают заголовки)
+# или из Authorization: Bearer
+def authenticate_token(token):
+    if not token:
+        return None
+
+    auth = MembershipJWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def get_board_member(token, id_board):
+    user = authenticate_token(token)
+    if user is None:
+        return None, False
+    return user, id_board in get_user_board_ids(user.id)
+
+
+async def is_board_member(token, id_board):
+    _, is_member = await sync_to_async(get_board_member)(token, id_board)
+    return is_member
+
+
+def bearer_token(header):
+    parts = (header or '').split()
+    if len(parts) == 2 and parts[0] == 'Bearer':
+        return parts[1]
+    return None
+
+
+# подписка создается до ответа клиенту, чтобы не потерять события
+# между подключением и первым ожиданием
+async def sse_stream(id_board, token):
+    subscription = get_broker().subscribe(id_board)
+    try:
+        yield ': connected\n\n'
+        while True:
+            batch = await subscription.next_batch(
+                settings.BOARD_EVENTS_TICK, settings.BOARD_EVENTS_HEARTBEAT
+            )
+            if not await is_board_member(token, id_board):
+                yield 'event: close\ndata: access denied\n\n'
+                return
+            if batch is None:
+                yield ': ping\n\n'
+                continue
+            yield 'id: %s\ndata: %s\n\n' % (batch['seq'], dumps(batch).decode())
+    finally:
+        subscription.close()
+
+
+async def board_events(request, pk):
+    # под WSGI Django читает асинхронный поток до конца в одном воркере,
+    # а этот поток бесконечен
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse('event stream requires an ASGI server', status=501)
+
+    token = request.GET.get('token') or bearer_token(
+        request.headers.get('Authorization')
+    )
+    user, is_member = await sync_to_async(get_board_member)(token, pk)
+    if user is None:
+        return HttpResponse('authentication required', status=401)
+    if not is_member:
+        return HttpResponse('access denied', status=403)
+
+    response = StreamingHttpResponse(
+        sse_stream(pk, token), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def websocket_application(scope, receive, send):
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    match = WEBSOCKET_PATH.match(scope['path'])
+    if match is None:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    token = query.get('token', [None])[0]
+    if token is None:
+        headers = dict(scope.get('headers', ()))
+        token = bearer_token(headers.get(b'authorization', b'').decode())
+
+    id_board = int(match['pk'])
+    user, is_member = await sync_to_async(get_board_member)(token, id_board)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+    if not is_member:
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    subscription = get_broker().subscribe(id_board)
+    await send({'type': 'websocket.accept'})
+
+    async def pump():
+        while True:
+            batch = await subscription.next_batch(
+                settings.BOARD_EVENTS_TICK, settings.BOARD_EVENTS_HEARTBEAT
+            )
+            if not await is_board_member(token, id_board):
+                await send({'type': 'websocket.close', 'code': 4403})
+                return
+            if batch is not None:
+                await send({'type': 'websocket.send', 'text': dumps(batch).decode()})
+
+    # сообщения клиента не нужны, ждем только отключения
+    task = asyncio.ensure_future(pump())
+    try:
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+    finally:
+        task.cancel()
+        subscription.close()
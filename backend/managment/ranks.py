@@ -0,0 +1,69 @@
+# Порядок блоков доски - строковый ранг (Block.rank), строки сравниваются
+# посимвольно. Между двумя рангами всегда есть третий, поэтому перенос
+# блока пишет одну строку. Ранги из цифр и строчных латинских букв
+# сравниваются одинаково в SQLite и в PostgreSQL, и ранг не оканчивается
+# на '0', иначе между 'a' и 'a0' ничего не вставить.
+# При частых переносах в одно место ранги удлиняются, их выравнивает
+# moves.rebalance_blocks (команда rebalance_block_ranks).
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+RANK_MAX_LENGTH = 64
+# длиннее - доска выравнивается командой rebalance_block_ranks
+REBALANCE_LENGTH = 16
+
+
+# ранг строго между before и after (None - край списка)
+def rank_between(before, after):
+    if after is not None and (before or '') >= after:
+        raise ValueError('%r must be less than %r' % (before, after))
+
+    step = 0
+    if after is None:
+        step = 1
+    elif before is None:
+        step = -1
+    return _between(before or '', after, step)
+
+
+# step: 1 - в конец списка, -1 - в начало, 0 - между соседями (середина)
+def _between(before, after, step):
+    if after is not None:
+        n = 0
+        while n < len(after) and (before[n] if n < len(before) else '0') == after[n]:
+            n += 1
+        if n > 0:
+            return after[:n] + _between(before[n:], after[n:], step)
+
+    low = DIGITS.index(before[0]) if before else 0
+    high = DIGITS.index(after[0]) if after is not None else len(DIGITS)
+    if high - low > 1:
+        # в края списка блоки добавляются чаще всего: шаг в одну цифру
+        # удлиняет ранг на символ только через каждые len(DIGITS) вставок
+        if step > 0:
+            return DIGITS[low + 1]
+        if step < 0:
+            return DIGITS[high - 1]
+        return DIGITS[(low + high + 1) // 2]
+
+    # соседние цифры: ранг продолжается следующим разрядом
+    if after is not None and len(after) > 1:
+        return after[0]
+    return DIGITS[low] + _between(before[1:], None, step)
+
+
+# count равномерно расставленных рангов одинаковой длины
+def spread_ranks(count):
+    width = 1
+    while len(DIGITS) ** width <= count:
+        width += 1
+
+    step = len(DIGITS) ** width // (count + 1)
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits.append(DIGITS[digit])
+        ranks.append(''.join(reversed(digits)).rstrip('0'))
+    return ranks
@@ -0,0 +1,71 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+from rest_framework.utils.json import strict_constant
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON через orjson, если он установлен, иначе через стандартный json.
+# Вывод совпадает с JSONRenderer: datetime/Decimal/lazy-строки и прочие
+# нестандартные типы кодирует тот же encoders.JSONEncoder.default.
+
+_default = encoders.JSONEncoder().default
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data):
+    if orjson is not None:
+        ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+    else:
+        ret = json.dumps(
+            data, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':')
+        ).encode()
+
+    # как JSONRenderer: U+2028/U+2029 экранируются для встраивания в JS
+    return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    # orjson тоже не принимает NaN/Infinity, как JSONParser со STRICT_JSON
+    return json.loads(data, parse_constant=strict_constant)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        # отступы (browsable API, ?indent) и ensure_ascii - обычным JSONRenderer
+        if (
+            self.get_indent(accepted_media_type, renderer_context or {})
+            or self.ensure_ascii
+            or not self.compact
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return loads(data)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
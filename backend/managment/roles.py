@@ -0,0 +1,116 @@
+import enum
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import UserRole
+
+
+# Разрешения роли в виде битовой маски. Имена флагов совпадают
+# с булевыми полями UserRole, порядок битов менять нельзя.
+class RolePermission(enum.IntFlag):
+    ADD_MEMBERS = 1 << 0
+    DELETE_MEMBERS = 1 << 1
+    EDIT_MEMBERS = 1 << 2
+
+    COMMENTING = 1 << 3
+    DELETING_ALL_COMMENT = 1 << 4
+    DELETING_UR_COMMENT = 1 << 5
+    EDITING_UR_COMMENT = 1 << 6
+
+    CREATING_TASK = 1 << 7
+    DELETING_TASK = 1 << 8
+    EDITING_TASK = 1 << 9
+
+    EDITING_BOARD = 1 << 10
+    DELETING_BOARD = 1 << 11
+
+    CREATING_BLOCK = 1 << 12
+    EDITING_BLOCK = 1 << 13
+    DELETING_BLOCK = 1 << 14
+
+    CREATING_STATUS_TASK = 1 << 15
+    EDITING_STATUS_TASK = 1 << 16
+    DELETING_STATUS_TASK = 1 << 17
+
+    CREATING_ROLE = 1 << 18
+    EDITING_ROLE = 1 << 19
+    DELETING_ROLE = 1 << 20
+
+
+ROLE_PERMISSION_FIELDS = tuple(flag.name.lower() for flag in RolePermission)
+
+
+# role - объект UserRole или словарь из .values()
+def compile_role_mask(role):
+    if not isinstance(role, dict):
+        role = {field: getattr(role, field) for field in ROLE_PERMISSION_FIELDS}
+
+    mask = RolePermission(0)
+    for flag in RolePermission:
+        if role[flag.name.lower()]:
+            mask |= flag
+    return mask
+
+
+def role_version_cache_key(id_role):
+    return 'managment:role_version:%s' % id_role
+
+
+# Кэш масок ролей на уровне процесса. Запись сверяется с версией роли
+# в общем кэше Django: сигналы post_save/post_delete UserRole (signals.py)
+# в любом процессе удаляют версию, и остальные процессы пересчитывают
+# маску. Изменения без сигналов (queryset.update()) видны не позже
+# чем через ROLE_MASK_TTL секунд.
+class RoleMaskCache:
+    def __init__(self):
+        # id роли -> (версия, срок годности, маска)
+        self._masks = {}
+        self._lock = threading.Lock()
+
+    def get(self, id_role):
+        key = role_version_cache_key(id_role)
+        cache.add(key, uuid.uuid4().hex[:8], None)
+        version = cache.get(key)
+
+        entry = self._masks.get(id_role)
+        if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+            return entry[2]
+
+        row = (
+            UserRole.objects.filter(id=id_role).values(*ROLE_PERMISSION_FIELDS).first()
+        )
+        if row is None:
+            return RolePermission(0)
+
+        mask = compile_role_mask(row)
+        with self._lock:
+            self._masks[id_role] = (
+                version,
+                time.monotonic() + settings.ROLE_MASK_TTL,
+                mask,
+            )
+        return mask
+
+    def invalidate(self, id_role):
+        cache.delete(role_version_cache_key(id_role))
+        with self._lock:
+            self._masks.pop(id_role, None)
+
+    def clear(self):
+        with self._lock:
+            self._masks.clear()
+
+
+role_masks = RoleMaskCache()
+
+
+# у UserBoard из claims токена маска уже есть в role_mask
+def role_can(user_board, permission):
+    mask = getattr(user_board, 'role_mask', None)
+    if mask is None:
+        mask = role_masks.get(user_board.id_user_role_id)
+    return bool(mask & permission)
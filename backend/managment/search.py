@@ -0,0 +1,117 @@
+import html
+import re
+
+from django.db import connection
+
+from .search_index import SEARCH_CONFIG
+
+# Поиск по задачам и комментариям досок пользователя (/api/search/?q=).
+# Индексы - search_index.py. Каждая таблица ищется отдельным запросом
+# с LIMIT, результаты сливаются по score (больше - лучше). Подсветка
+# считается только для отобранных строк, совпадения оборачиваются в <mark>,
+# остальной текст экранируется.
+
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# маркеры подсветки из БД, заменяются на <mark> после экранирования
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+# тип результата -> (таблица, дополнительные колонки)
+SEARCH_KINDS = {
+    'task': ('managment_task', ()),
+    'comment': ('managment_comment', ('id_task_id',)),
+}
+
+_POSTGRES_SQL = '''
+SELECT m.id, m.id_board_id{extra}, m.score,
+    ts_headline('{config}', coalesce(m.text, ''), m.query, %s),
+    ts_headline('{config}', coalesce(m.description, ''), m.query, %s)
+FROM (
+    SELECT t.*, ts_rank(t.search, q) AS score, q AS query
+    FROM {table} t, websearch_to_tsquery('{config}', %s) q
+    WHERE t.search @@ q AND t.id_board_id = ANY(%s)
+    ORDER BY score DESC, t.id
+    LIMIT %s
+) m
+ORDER BY m.score DESC, m.id
+'''
+
+_POSTGRES_HEADLINE = 'StartSel=%s, StopSel=%s, HighlightAll=true' % (
+    MARK_START,
+    MARK_END,
+)
+
+# bm25 меньше - лучше; веса text/description как setweight A/B в PostgreSQL
+_SQLITE_SQL = '''
+SELECT t.id, t.id_board_id{extra}, -bm25({table}_fts, 2.0, 1.0) AS score,
+    highlight({table}_fts, 0, char(2), char(3)),
+    highlight({table}_fts, 1, char(2), char(3))
+FROM {table}_fts JOIN {table} t ON t.id = {table}_fts.rowid
+WHERE {table}_fts MATCH %s AND t.id_board_id IN ({boards})
+ORDER BY score DESC, t.id
+LIMIT %s
+'''
+
+
+# слова запроса в синтаксисе FTS5: каждое в кавычках, все обязательны
+def fts5_query(query):
+    return ' '.join('"%s"' % word for word in re.findall(r'\w+', query))
+
+
+def highlight(value):
+    if not value:
+        return value
+    value = html.escape(value)
+    return value.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def _search_table(kind, boards_id, query, limit):
+    table, extra = SEARCH_KINDS[kind]
+    extra_sql = ''.join(', t.%s' % column for column in extra)
+
+    if connection.vendor == 'postgresql':
+        sql = _POSTGRES_SQL.format(
+            table=table,
+            config=SEARCH_CONFIG,
+            extra=extra_sql.replace('t.', 'm.'),
+        )
+        params = [_POSTGRES_HEADLINE, _POSTGRES_HEADLINE, query, boards_id, limit]
+    else:
+        query = fts5_query(query)
+        if not query:
+            return []
+        sql = _SQLITE_SQL.format(
+            table=table, extra=extra_sql, boards=', '.join(['%s'] * len(boards_id))
+        )
+        params = [query, *boards_id, limit]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    results = []
+    for row in rows:
+        item = {'type': kind, 'id': row[0], 'id_board': row[1]}
+        for column, value in zip(extra, row[2:]):
+            item[column.removesuffix('_id')] = value
+        score, text, description = row[-3:]
+        item['score'] = score
+        item['highlight'] = {
+            'text': highlight(text),
+            'description': highlight(description),
+        }
+        results.append(item)
+    return results
+
+
+def search(boards_id, query, kinds=tuple(SEARCH_KINDS), limit=SEARCH_LIMIT):
+    if not boards_id or not query.strip():
+        return []
+
+    results = []
+    for kind in kinds:
+        results += _search_table(kind, list(boards_id), query, limit)
+    results.sort(key=lambda item: -item['score'])
+    return results[:limit]
@@ -0,0 +1,102 @@
+# Полнотекстовый индекс задач и комментариев (text, description) для search.py.
+# PostgreSQL: генерируемая колонка search (tsvector) с GIN-индексом, в модели
+# ее нет, обновляет сама БД. SQLite: внешняя FTS5-таблица <таблица>_fts,
+# ее синхронизируют триггеры. Конфигурация 'simple' без стемминга:
+# в досках смешаны русский и английский.
+
+SEARCH_CONFIG = 'simple'
+SEARCH_TABLES = ('managment_task', 'managment_comment')
+
+_POSTGRES_INSTALL = [
+    (
+        'ALTER TABLE {table} ADD COLUMN search tsvector GENERATED ALWAYS AS ('
+        "setweight(to_tsvector('simple', coalesce(text, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+        ') STORED'
+    ),
+    'CREATE INDEX {table}_search_idx ON {table} USING gin (search)',
+]
+
+_POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS {table}_search_idx',
+    'ALTER TABLE {table} DROP COLUMN IF EXISTS search',
+]
+
+_SQLITE_INSTALL = [
+    (
+        'CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5('
+        "text, description, content='{table}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    ),
+    "INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')",
+]
+
+_SQLITE_TRIGGERS = {
+    '{table}_fts_insert': '''
+CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table}
+BEGIN
+    INSERT INTO {table}_fts(rowid, text, description)
+    VALUES (NEW.id, NEW.text, NEW.description);
+END
+''',
+    '{table}_fts_delete': '''
+CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table}
+BEGIN
+    INSERT INTO {table}_fts({table}_fts, rowid, text, description)
+    VALUES ('delete', OLD.id, OLD.text, OLD.description);
+END
+''',
+    '{table}_fts_update': '''
+CREATE TRIGGER IF NOT EXISTS {table}_fts_update
+AFTER UPDATE OF text, description ON {table}
+BEGIN
+    INSERT INTO {table}_fts({table}_fts, rowid, text, description)
+    VALUES ('delete', OLD.id, OLD.text, OLD.description);
+    INSERT INTO {table}_fts(rowid, text, description)
+    VALUES (NEW.id, NEW.text, NEW.description);
+END
+''',
+}
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for table in SEARCH_TABLES:
+            for sql in statements:
+                cursor.execute(sql.format(table=table))
+
+
+def install_search_index(connection):
+    if connection.vendor == 'postgresql':
+        _execute(connection, _POSTGRES_INSTALL)
+
+    if connection.vendor == 'sqlite':
+        _execute(connection, _SQLITE_INSTALL + list(_SQLITE_TRIGGERS.values()))
+
+
+def uninstall_search_index(connection):
+    if connection.vendor == 'postgresql':
+        _execute(connection, _POSTGRES_UNINSTALL)
+
+    if connection.vendor == 'sqlite':
+        _execute(
+            connection,
+            ['DROP TRIGGER IF EXISTS %s' % name for name in _SQLITE_TRIGGERS]
+            + ['DROP TABLE IF EXISTS {table}_fts'],
+        )
+
+
+# SQLite удаляет триггеры вместе с таблицей, которую миграция пересоздает,
+# поэтому после migrate они ставятся заново; индекс при этом не меняется,
+# id строк сохраняются
+def reinstall_search_triggers(connection):
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        for table in SEARCH_TABLES:
+            if table + '_fts' not in tables:
+                continue
+            for sql in _SQLITE_TRIGGERS.values():
+                cursor.execute(sql.format(table=table))
@@ -4,6 +4,7 @@ from rest_framework import serializers
 from .models import Block, Board, Comment, StatusTask, Task, User, UserBoard, UserRole
 
 
+# fields=[...] оставляет только перечисленные поля (?fields= в GET-запросах)
 class DynamicFieldsCategorySerializer(serializers.ModelSerializer):
     def __init__(self, *args, **kwargs):
         fields = kwargs.pop('fields', None)
@@ -16,7 +17,7 @@ class DynamicFieldsCategorySerializer(serializers.ModelSerializer):
                 self.fields.pop(field_name)
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(DynamicFieldsCategorySerializer):
     class Meta:
         model = Comment
         fields = ('id', 'id_user', 'text', 'description', 'id_task')
@@ -29,7 +30,7 @@ class UserBoardSerializer(DynamicFieldsCategorySerializer):
         read_only_fields = ('is_admin',)
 
 
-class BoardSerializer(serializers.ModelSerializer):
+class BoardSerializer(DynamicFieldsCategorySerializer):
     users = UserBoardSerializer(
         many=True, fields=['id_user', 'id_user_role'], required=False
     )
@@ -39,7 +40,25 @@ class BoardSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'users')
 
 
-class ExtUserSerializer(serializers.ModelSerializer):
+class BoardCreateSerializer(serializers.ModelSerializer):
+    defaults = serializers.BooleanField(write_only=True, default=False)
+
+    class Meta:
+        model = Board
+        fields = ('name', 'defaults')
+
+
+# копия доски: имя по умолчанию - имя исходной, tasks - копировать задачи
+class BoardCloneSerializer(serializers.ModelSerializer):
+    tasks = serializers.BooleanField(default=False)
+
+    class Meta:
+        model = Board
+        fields = ('name', 'tasks')
+        extra_kwargs = {'name': {'required': False}}
+
+
+class ExtUserSerializer(DynamicFieldsCategorySerializer):
     boards = UserBoardSerializer(
         many=True, fields=['id_board', 'id_user_role'], required=False
     )
@@ -86,7 +105,7 @@ class UpdateUserSerializer(serializers.Serializer):
         return data
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsCategorySerializer):
     boards = UserBoardSerializer(
         many=True, fields=['id_board', 'id_user_role'], required=False
     )
@@ -132,7 +151,7 @@ class UserSerializer(serializers.ModelSerializer):
         return data
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(DynamicFieldsCategorySerializer):
     comments = serializers.PrimaryKeyRelatedField(
         many=True, read_only=True, required=False
     )
@@ -146,27 +165,52 @@ class TaskSerializer(serializers.ModelSerializer):
             'text',
             'description',
             'date',
+            'rank',
             'comments',
         )
 
 
-class BlockSerializer(serializers.ModelSerializer):
+# пакетные операции с задачами: блок и статус - просто id,
+# их доска проверяется одним запросом на весь пакет (bulk.py)
+class BulkTaskSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    id_block = serializers.IntegerField(source='id_block_id')
+    id_status_task = serializers.IntegerField(source='id_status_task_id')
+
+    class Meta:
+        model = Task
+        fields = ('id', 'id_block', 'id_status_task', 'text', 'description', 'date')
+
+
+class BlockSerializer(DynamicFieldsCategorySerializer):
     tasks = serializers.PrimaryKeyRelatedField(
         many=True, read_only=True, required=False
     )
 
     class Meta:
         model = Block
-        fields = ('id', 'name', 'position', 'id_board', 'tasks')
+        fields = ('id', 'name', 'position', 'rank', 'id_board', 'tasks')
+
+
+# соседи блока после переноса (moves.py)
+class BlockMoveSerializer(serializers.Serializer):
+    after = serializers.IntegerField(required=False, allow_null=True)
+    before = serializers.IntegerField(required=False, allow_null=True)
+
+
+# новые блок, статус и соседи задачи (moves.py)
+class TaskMoveSerializer(BlockMoveSerializer):
+    id_block = serializers.IntegerField(required=False, allow_null=True)
+    id_status_task = serializers.IntegerField(required=False, allow_null=True)
 
 
-class StatusTaskSerializer(serializers.ModelSerializer):
+class StatusTaskSerializer(DynamicFieldsCategorySerializer):
     class Meta:
         model = StatusTask
         fields = ('id', 'name', 'id_board')
 
 
-class UserRoleSerializer(serializers.ModelSerializer):
+class UserRoleSerializer(DynamicFieldsCategorySerializer):
     class Meta:
         model = UserRole
         fields = (
@@ -192,3 +236,33 @@ class UserRoleSerializer(serializers.ModelSerializer):
             'editing_role',
             'deleting_role',
         )
+
+
+class SnapshotTaskSerializer(serializers.ModelSerializer):
+    comments_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Task
+        fields = (
+            'id',
+            'id_block',
+            'id_status_task',
+            'text',
+            'description',
+            'date',
+            'rank',
+            'comments_count',
+        )
+
+
+# Доска целиком для отрисовки канбана, связи должны быть загружены prefetch_related
+class BoardSnapshotSerializer(serializers.ModelSerializer):
+    blocks = BlockSerializer(many=True, read_only=True, source='board')
+    tasks = SnapshotTaskSerializer(many=True, read_only=True)
+    status_tasks = StatusTaskSerializer(many=True, read_only=True)
+    roles = UserRoleSerializer(many=True, read_only=True)
+    users = UserBoardSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Board
+        fields = ('id', 'name', 'blocks', 'tasks', 'status_tasks', 'roles', 'users')
@@ -0,0 +1,123 @@
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import bump_token_epoch
+from .db_constraints import reinstall_sqlite_triggers
+from .membership import invalidate_user_boards
+from .models import (
+    Block,
+    Board,
+    BoardChange,
+    Comment,
+    StatusTask,
+    Task,
+    User,
+    UserBoard,
+    UserRole,
+)
+from .roles import role_masks
+from .search_index import reinstall_search_triggers
+from .versions import bump_board_version, record_board_change
+
+
+# маска роли пересчитывается при следующем обращении
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_role_mask(sender, instance, **kwargs):
+    role_masks.invalidate(instance.id)
+    # повторно после коммита: маску могли прочитать внутри той же транзакции
+    transaction.on_commit(lambda: role_masks.invalidate(instance.id))
+
+
+# маска роли есть в токенах всех участников с этой ролью
+@receiver(post_save, sender=UserRole)
+def bump_role_members_token_epoch(sender, instance, created, **kwargs):
+    if created:
+        return
+
+    users_id = list(
+        UserBoard.objects.filter(id_user_role=instance).values_list(
+            'id_user', flat=True
+        )
+    )
+    if users_id:
+        bump_token_epoch(*users_id)
+
+
+# при переносе участника в другую доску сбрасываем индекс и прежнего пользователя
+@receiver(pre_save, sender=UserBoard)
+def remember_user_board_owner(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._previous_id_user = None
+        return
+
+    instance._previous_id_user = (
+        UserBoard.objects.filter(pk=instance.pk)
+        .values_list('id_user', flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=UserBoard)
+@receiver(post_delete, sender=UserBoard)
+def invalidate_user_boards_index(sender, instance, **kwargs):
+    users_id = {instance.id_user_id}
+    previous_id_user = getattr(instance, '_previous_id_user', None)
+    if previous_id_user is not None:
+        users_id.add(previous_id_user)
+
+    invalidate_user_boards(*users_id)
+    bump_token_epoch(*users_id)
+    transaction.on_commit(lambda: invalidate_user_boards(*users_id))
+
+
+# новый пользователь может получить id, под которым в кэше остался чужой индекс
+@receiver(post_save, sender=User)
+def reset_new_user_boards_index(sender, instance, created, **kwargs):
+    if created:
+        invalidate_user_boards(instance.id)
+
+
+# флаги пользователя (is_active, is_staff, ...) тоже входят в токен
+@receiver(post_save, sender=User)
+def bump_user_token_epoch(sender, instance, created, **kwargs):
+    if not created:
+        bump_token_epoch(instance.id)
+
+
+# любое изменение объектов доски меняет ее версию (ETag) и пишется в журнал.
+# При удалении самой доски каскад не трогает удаляемую строку.
+BOARD_OBJECTS = (Block, Task, Comment, StatusTask, UserRole, UserBoard)
+
+
+def deleting_board(origin):
+    return isinstance(origin, Board) or getattr(origin, 'model', None) is Board
+
+
+def record_saved_board_object(sender, instance, created, **kwargs):
+    action = BoardChange.INSERT if created else BoardChange.UPDATE
+    record_board_change(instance.id_board_id, instance, action)
+
+
+def record_deleted_board_object(sender, instance, origin=None, **kwargs):
+    if not deleting_board(origin):
+        record_board_change(instance.id_board_id, instance, BoardChange.DELETE)
+
+
+for model in BOARD_OBJECTS:
+    post_save.connect(record_saved_board_object, sender=model)
+    post_delete.connect(record_deleted_board_object, sender=model)
+
+
+@receiver(post_save, sender=Board)
+def bump_board_version_on_save(sender, instance, created, **kwargs):
+    if not created:
+        bump_board_version(instance.id)
+
+
+@receiver(post_migrate)
+def restore_same_board_triggers(sender, using, **kwargs):
+    if sender.name == 'managment':
+        reinstall_sqlite_triggers(connections[using])
+        reinstall_search_triggers(connections[using])
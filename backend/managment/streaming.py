@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .projections import serialize_chunks
+from .renderers import dumps
+
+
+# Потоковая отдача списка JSON-массивом: строки читаются и кодируются
+# частями по LIST_STREAM_CHUNK_SIZE, поэтому память не растет с размером выборки.
+# Формат как у FastJSONRenderer (renderers.py).
+def encode_items(items):
+    # массив без скобок: "[a,b]" -> "a,b"
+    return dumps(items)[1:-1]
+
+
+def json_array_stream(chunks):
+    yield b'['
+    first = True
+    for items in chunks:
+        if not items:
+            continue
+        data = encode_items(items)
+        yield data if first else b',' + data
+        first = False
+    yield b']'
+
+
+def stream_rows(serializer_class, queryset, fields=None):
+    chunks = serialize_chunks(
+        serializer_class, queryset, settings.LIST_STREAM_CHUNK_SIZE, fields
+    )
+    return StreamingHttpResponse(
+        json_array_stream(chunks), content_type='application/json'
+    )
@@ -1,23 +1,53 @@
+import asyncio
+import datetime
+import decimal
+import io
+import json
+import time
+import uuid
 from asyncio import start_unix_server
 from collections import namedtuple
 from inspect import formatannotation
 from typing import assert_type
+from unittest import mock
 
 from django import setup
+from django.conf import settings
 from django.contrib.auth.base_user import password_validation
 from django.contrib.auth.password_validation import password_changed
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.db.models.fields import return_None
 from django.db.models.functions import TruncMinute
 from django.http import Http404, request
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils.safestring import SafeText
+from django.utils.translation import gettext_lazy
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
 from rest_framework.test import (APIClient, APIRequestFactory, APITestCase,
                                  force_authenticate)
 from rest_framework_simplejwt.tokens import AccessToken
 
-from .models import (Block, Board, Comment, StatusTask, Task, User, UserBoard,
-                     UserRole)
+from . import events, renderers
+from .authentication import MembershipRefreshToken, get_token_epoch
+from .checks import check_stateless_jwt_cache
+from .events import NOTIFY_CHANGES_BYTES, InProcessBroker, split_batch
+from .fuzzy import trigram_indexes
+from .membership import get_user_board_ids
+from .models import (Block, Board, BoardChange, Comment, StatusTask, Task,
+                     User, UserBoard, UserRole)
+from .projections import serialize_rows
+from .push import sse_stream, websocket_application
+from .ranks import REBALANCE_LENGTH, rank_between
+from .renderers import FastJSONParser, FastJSONRenderer
+from .roles import RoleMaskCache, RolePermission, compile_role_mask, role_masks
+from .serializers import BoardSerializer, ExtUserSerializer, TaskSerializer
+from .versions import record_board_changes
 
 
 class JWTTest(APITestCase):
@@ -64,6 +94,79 @@ class JWTTest(APITestCase):
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
 
 
+class StatelessJWTTest(APITestCase):
+    # участие и маска роли берутся из токена, пока эпоха пользователя не сменилась
+    def test_api_stateless_jwt(self):
+        user = User.objects.create_user(
+            username='test', email='test@test.ru', password='test'
+        )
+        board = Board.objects.create(name='1')
+        board2 = Board.objects.create(name='2')
+        user_role = UserRole.objects.create(name='1', id_board=board)
+        UserBoard.objects.create(id_user=user, id_board=board, id_user_role=user_role)
+
+        token = MembershipRefreshToken.for_user(user).access_token
+        self.assertEqual(token['boards'][str(board.id)][1], user_role.id)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer ' + str(token))
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.post('/api/blocks/', {'name': 'abc', 'id_board': board.id})
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(
+            any(
+                'managment_user' in q['sql'] for q in queries.captured_queries
+            )
+        )
+
+        resp = client.post('/api/blocks/', {'name': 'abc', 'id_board': board2.id})
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+        # смена роли делает claims токена устаревшими, проверка идет через БД
+        user_role.creating_block = False
+        user_role.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.post('/api/blocks/', {'name': 'abc', 'id_board': board.id})
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(
+            any(
+                'managment_user' in q['sql'] for q in queries.captured_queries
+            )
+        )
+
+        token = MembershipRefreshToken.for_user(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer ' + str(token))
+        resp = client.post('/api/blocks/', {'name': 'abc', 'id_board': board.id})
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    # эпоха хранится в БД: процесс с пустым кэшем тоже не примет старые claims
+    def test_token_epoch_survives_cache(self):
+        user = User.objects.create_user(
+            username='test', email='test@test.ru', password='test'
+        )
+        board = Board.objects.create(name='1')
+        user_role = UserRole.objects.create(name='1', id_board=board)
+        UserBoard.objects.create(id_user=user, id_board=board, id_user_role=user_role)
+        token = MembershipRefreshToken.for_user(user).access_token
+        self.assertEqual(token['epoch'], get_token_epoch(user.id))
+
+        user_role.creating_block = False
+        user_role.save()
+        cache.clear()
+        self.assertNotEqual(token['epoch'], get_token_epoch(user.id))
+        self.assertEqual(
+            User.objects.get(id=user.id).token_epoch, get_token_epoch(user.id)
+        )
+
+    def test_stateless_jwt_requires_shared_cache(self):
+        with override_settings(STATELESS_JWT=True):
+            errors = check_stateless_jwt_cache(None)
+        self.assertEqual([error.id for error in errors], ['managment.E001'])
+        self.assertEqual(check_stateless_jwt_cache(None), [])
+
+
 class UserTest(APITestCase):
 
     # Получение юзером данных о себе полностью, а не своих не полностью
@@ -98,6 +201,28 @@ class UserTest(APITestCase):
         self.assertNotContains(resp, 'login')
         self.assertNotContains(resp, 'password')
 
+    # ?stream=1 отдает весь список потоком, содержимое как у постраничного ответа
+    @override_settings(LIST_STREAM_CHUNK_SIZE=2)
+    def test_api_user_list_stream(self):
+        user = User.objects.create_user(username='test', password='test')
+        board = Board.objects.create(name='1')
+        user_role = UserRole.objects.create(name='1', id_board=board)
+        UserBoard.objects.create(id_user=user, id_board=board, id_user_role=user_role)
+        for i in range(4):
+            User.objects.create_user(username='test' + str(i), password='test')
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        resp = client.get('/api/users/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        stream = client.get('/api/users/?stream=1')
+        self.assertEqual(stream.status_code, status.HTTP_200_OK)
+        self.assertTrue(stream.streaming)
+        self.assertEqual(stream['Content-Type'], 'application/json')
+        self.assertEqual(stream.getvalue(), resp.content)
+
     # Тест регистрации
     def test_registration(self):
         url = '/auth/users/'
@@ -763,6 +888,47 @@ class UserRoleTests(APITestCase):
         self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
 
 
+    # маска роли кэшируется и сбрасывается при изменении или удалении роли
+    def test_role_mask_cache(self):
+        board = Board.objects.create(name='1')
+        role = UserRole.objects.create(name='1', id_board=board, editing_role=True)
+
+        mask = role_masks.get(role.id)
+        self.assertEqual(mask, compile_role_mask(role))
+        self.assertTrue(mask & RolePermission.EDITING_ROLE)
+        self.assertFalse(mask & RolePermission.DELETING_ROLE)
+
+        with self.assertNumQueries(0):
+            role_masks.get(role.id)
+
+        role.editing_role = False
+        role.save()
+        self.assertFalse(role_masks.get(role.id) & RolePermission.EDITING_ROLE)
+
+        id_role = role.id
+        role.delete()
+        self.assertEqual(role_masks.get(id_role), RolePermission(0))
+
+    # изменение роли в другом процессе и queryset.update() без сигналов
+    def test_role_mask_cache_shared(self):
+        board = Board.objects.create(name='1')
+        role = UserRole.objects.create(name='1', id_board=board, editing_role=True)
+        self.assertTrue(role_masks.get(role.id) & RolePermission.EDITING_ROLE)
+
+        # другой процесс сохраняет роль: его сигнал сбрасывает версию в общем кэше
+        other_process = RoleMaskCache()
+        UserRole.objects.filter(id=role.id).update(editing_role=False)
+        other_process.invalidate(role.id)
+        self.assertFalse(role_masks.get(role.id) & RolePermission.EDITING_ROLE)
+
+        # без сигнала маска обновляется по истечении ROLE_MASK_TTL
+        UserRole.objects.filter(id=role.id).update(editing_role=True)
+        self.assertFalse(role_masks.get(role.id) & RolePermission.EDITING_ROLE)
+        later = time.monotonic() + settings.ROLE_MASK_TTL + 1
+        with mock.patch('managment.roles.time.monotonic', return_value=later):
+            self.assertTrue(role_masks.get(role.id) & RolePermission.EDITING_ROLE)
+
+
 class UserBoardTests(APITestCase):
     def test_api_user_board_owner_user(self):
         user = User.objects.create_user(
@@ -1034,6 +1200,46 @@ class UserBoardTests(APITestCase):
         self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+    # индекс досок пользователя берется из кэша и обновляется при изменении UserBoard
+    def test_user_boards_index(self):
+        user = User.objects.create_user(
+            username='qwerty', email='qwerty', password='qwertqwert'
+        )
+        board = Board.objects.create(name='1')
+        board2 = Board.objects.create(name='2')
+        user_role = UserRole.objects.create(name='1', id_board=board)
+        user_role2 = UserRole.objects.create(name='2', id_board=board2)
+        UserBoard.objects.create(
+            id_user=user, id_board=board, id_user_role=user_role, is_admin=True
+        )
+
+        self.assertEqual(get_user_board_ids(user.id), [board.id])
+
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer ' + str(AccessToken.for_user(user))
+        )
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get('/api/boards/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        # выборка досок по участнику не выполняется, индекс уже в кэше
+        self.assertFalse(
+            any('"id_user_id" =' in q['sql'] for q in queries.captured_queries)
+        )
+
+        user_board2 = UserBoard.objects.create(
+            id_user=user, id_board=board2, id_user_role=user_role2
+        )
+        self.assertEqual(
+            sorted(get_user_board_ids(user.id)), sorted([board.id, board2.id])
+        )
+        self.assertEqual(get_user_board_ids(user.id, is_admin=True), [board.id])
+        self.assertEqual(get_user_board_ids(user.id, is_admin=False), [board2.id])
+
+        user_board2.delete()
+        self.assertEqual(get_user_board_ids(user.id), [board.id])
+
+
 class BoardTests(APITestCase):
     @classmethod
     def setUpData(cls):
@@ -1180,6 +1386,450 @@ class BoardTests(APITestCase):
         self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
 
 
+    # доска, роль, участие и заготовки - одной транзакцией без latest()
+    def test_api_board_create_defaults(self):
+        data = BoardTests.setUpData()
+        client = data['client']
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.post(
+                '/api/boards/', {'name': 'new', 'defaults': True}, format='json'
+            )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        # по одному INSERT на таблицу, включая журнал изменений
+        inserts = [
+            q['sql'].split('"')[1]
+            for q in queries.captured_queries
+            if q['sql'].startswith('INSERT INTO')
+        ]
+        self.assertEqual(
+            sorted(inserts),
+            [
+                'managment_block',
+                'managment_board',
+                'managment_boardchange',
+                'managment_statustask',
+                'managment_userboard',
+                'managment_userrole',
+            ],
+        )
+        statements = [
+            q for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']
+        ]
+        self.assertLessEqual(len(statements), 12)
+        board = Board.objects.get(id=resp.data['id'])
+        self.assertEqual(
+            resp.data['users'],
+            [{'id_user': data['user'].id, 'id_user_role': board.roles.get().id}],
+        )
+
+        user_board = UserBoard.objects.get(id_board=board, id_user=data['user'])
+        self.assertTrue(user_board.is_admin)
+        self.assertTrue(user_board.id_user_role.creating_role)
+        self.assertEqual(
+            list(board.status_tasks.order_by('id').values_list('name', flat=True)),
+            settings.BOARD_DEFAULT_STATUS_TASKS,
+        )
+        self.assertEqual(
+            list(
+                Block.objects.filter(id_board=board)
+                .order_by('rank')
+                .values_list('name', flat=True)
+            ),
+            settings.BOARD_DEFAULT_BLOCKS,
+        )
+        self.assertEqual(board.changes.count(), 8)
+
+        # индекс досок создателя обновлен
+        resp = client.get('/api/boards/' + str(board.id) + '/snapshot/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resp.data['blocks']), 3)
+
+        resp = client.post('/api/boards/', {'name': 'plain'})
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Block.objects.filter(id_board=resp.data['id']).exists())
+
+        resp = client.post('/api/boards/', {'name': 'x' * 100})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # копия доски: число запросов не зависит от числа задач
+    def test_api_board_clone(self):
+        data = BoardTests.setUpData()
+        client = data['client']
+        board = data['board']
+        url = '/api/boards/' + str(board.id) + '/clone/'
+
+        resp = client.post(url, {'tasks': True}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+        data['user_board'].is_admin = True
+        data['user_board'].save()
+
+        status_task = StatusTask.objects.create(name='s', id_board=board)
+        blocks = [Block.objects.create(name=str(i), id_board=board) for i in range(3)]
+        Task.objects.bulk_create(
+            [
+                Task(
+                    text=str(i),
+                    id_block=blocks[i % 3],
+                    id_status_task=status_task,
+                    id_board=board,
+                    rank=str(i + 1),
+                )
+                for i in range(5)
+            ]
+        )
+
+        def clone():
+            with CaptureQueriesContext(connection) as queries:
+                resp = client.post(url, {'name': 'copy', 'tasks': True}, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+            return resp, len(queries)
+
+        resp, queries_count = clone()
+        copy = Board.objects.get(id=resp.data['id'])
+        self.assertEqual(copy.name, 'copy')
+        copied_blocks = {b.name: b for b in Block.objects.filter(id_board=copy)}
+        self.assertEqual(sorted(copied_blocks), ['0', '1', '2'])
+        for task in Task.objects.filter(id_board=copy):
+            self.assertEqual(task.id_block.id_board_id, copy.id)
+            self.assertEqual(task.id_status_task.id_board_id, copy.id)
+            self.assertEqual(task.id_block.name, str(int(task.text) % 3))
+        self.assertEqual(Task.objects.filter(id_board=copy).count(), 5)
+        user_board = UserBoard.objects.get(id_board=copy, id_user=data['user'])
+        self.assertTrue(user_board.is_admin)
+        self.assertEqual(user_board.id_user_role.name, data['user_role'].name)
+
+        Task.objects.bulk_create(
+            [
+                Task(
+                    text=str(i),
+                    id_block=blocks[i % 3],
+                    id_status_task=status_task,
+                    id_board=board,
+                    rank='a',
+                )
+                for i in range(100)
+            ]
+        )
+        resp, more_queries_count = clone()
+        self.assertEqual(more_queries_count, queries_count)
+        self.assertEqual(Task.objects.filter(id_board=resp.data['id']).count(), 105)
+
+        # задачи копируются пачками, каждая пачка попадает в журнал
+        with mock.patch('managment.boards.CLONE_BATCH_SIZE', 40):
+            resp, _ = clone()
+        copy = Board.objects.get(id=resp.data['id'])
+        self.assertEqual(Task.objects.filter(id_board=copy).count(), 105)
+        self.assertEqual(copy.changes.filter(model='task').count(), 105)
+
+        resp = client.post(url, {}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(resp.data['name'], board.name)
+        self.assertFalse(Task.objects.filter(id_board=resp.data['id']).exists())
+
+        resp = client.post(
+            '/api/boards/' + str(data['board2'].id) + '/clone/', {}, format='json'
+        )
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    # удаление доски не читает ее объекты, строки удаляются командой частями
+    def test_api_board_delete_deferred(self):
+        data = BoardTests.setUpData()
+        client = data['client']
+        board = data['board']
+        data['user_board'].is_admin = True
+        data['user_board'].save()
+
+        status_task = StatusTask.objects.create(name='s', id_board=board)
+        block = Block.objects.create(name='b', id_board=board)
+        for i in range(5):
+            task = Task.objects.create(
+                text=str(i), id_block=block, id_status_task=status_task
+            )
+            Comment.objects.create(id_user=data['user'], id_task=task, text=str(i))
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.delete('/api/boards/' + str(board.id) + '/')
+        self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
+        sql = ' '.join(q['sql'] for q in queries.captured_queries)
+        self.assertNotIn('FROM "managment_task"', sql)
+        self.assertNotIn('FROM "managment_comment"', sql)
+
+        self.assertFalse(UserBoard.objects.filter(id_board=board).exists())
+        self.assertEqual(Task.objects.filter(id_board=board).count(), 5)
+        self.assertEqual(
+            client.get('/api/boards/' + str(board.id) + '/').status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        self.assertEqual(
+            client.get('/api/tasks/' + str(task.id) + '/').status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        self.assertNotIn(board.id, [b['id'] for b in client.get('/api/boards/').json()])
+
+        # до очистки объекты доски недоступны и суперпользователю
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@admin.com', password='adminadmin'
+        )
+        admin_client = APIClient()
+        admin_client.force_authenticate(admin)
+        for url in (
+            '/api/tasks/' + str(task.id) + '/',
+            '/api/blocks/' + str(block.id) + '/',
+            '/api/status_tasks/' + str(status_task.id) + '/',
+        ):
+            self.assertEqual(
+                admin_client.get(url).status_code, status.HTTP_404_NOT_FOUND
+            )
+        resp = admin_client.patch('/api/tasks/' + str(task.id) + '/', {'text': 'x'})
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+        resp = client.get('/api/comments/' + str(data['user'].id) + '/get_by_id_user/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json(), [])
+
+        call_command('purge_deleted_boards', chunk_size=2, stdout=io.StringIO())
+        self.assertFalse(Board.objects.filter(id=board.id).exists())
+        for model in (Comment, Task, Block, StatusTask, UserRole, BoardChange):
+            self.assertFalse(model.objects.filter(id_board=board.id).exists())
+        self.assertTrue(Board.objects.filter(id=data['board2'].id).exists())
+
+    # снимок доски собирается фиксированным числом запросов
+    def test_api_board_snapshot(self):
+        data = BoardTests.setUpData()
+        client = data['client']
+        board = data['board']
+
+        status_task = StatusTask.objects.create(name='1', id_board=board)
+        block = Block.objects.create(name='1', id_board=board, rank='m')
+        block2 = Block.objects.create(name='2', id_board=board, rank='g')
+        task = Task.objects.create(
+            text='1', id_block=block, id_status_task=status_task
+        )
+        Comment.objects.create(id_user=data['user'], id_task=task, text='1')
+
+        def get_snapshot():
+            return client.get('/api/boards/' + str(board.id) + '/snapshot/')
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = get_snapshot()
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        queries_count = len(queries.captured_queries)
+
+        snapshot = resp.json()
+        self.assertEqual([b['id'] for b in snapshot['blocks']], [block2.id, block.id])
+        self.assertEqual(snapshot['blocks'][1]['tasks'], [task.id])
+        self.assertEqual(snapshot['tasks'][0]['comments_count'], 1)
+        self.assertEqual(snapshot['status_tasks'][0]['id'], status_task.id)
+        self.assertEqual(snapshot['roles'][0]['id'], data['user_role'].id)
+        self.assertEqual(snapshot['users'][0]['id_user'], data['user'].id)
+
+        for i in range(5):
+            block = Block.objects.create(name=str(i), id_board=board)
+            for j in range(3):
+                task = Task.objects.create(
+                    text=str(j), id_block=block, id_status_task=status_task
+                )
+                Comment.objects.create(id_user=data['user'], id_task=task, text='1')
+
+        with self.assertNumQueries(queries_count):
+            resp = get_snapshot()
+        self.assertEqual(len(resp.json()['tasks']), 16)
+
+        resp = client.get('/api/boards/' + str(data['board2'].id) + '/snapshot/')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+
+    # журнал изменений: после since только новые изменения, по объекту - последнее
+    def test_api_board_changes(self):
+        data = BoardTests.setUpData()
+        client = data['client']
+        board = data['board']
+        url = '/api/boards/' + str(board.id) + '/changes/'
+
+        resp = client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        since = resp.json()['seq']
+
+        status_task = StatusTask.objects.create(name='1', id_board=board)
+        block = Block.objects.create(name='1', id_board=board)
+        block2 = Block.objects.create(name='2', id_board=board)
+        task = Task.objects.create(text='1', id_block=block, id_status_task=status_task)
+
+        resp = client.get(url, {'since': since})
+        changes = resp.json()['changes']
+        self.assertEqual(
+            [(c['model'], c['id'], c['action']) for c in changes],
+            [
+                ('statustask', status_task.id, 'insert'),
+                ('block', block.id, 'insert'),
+                ('block', block2.id, 'insert'),
+                ('task', task.id, 'insert'),
+            ],
+        )
+        self.assertEqual(changes[3]['data']['text'], '1')
+        since = resp.json()['seq']
+
+        task.text = '2'
+        task.save()
+        task.text = '3'
+        task.save()
+        block2_id = block2.id
+        block2.delete()
+
+        resp = client.get(url, {'since': since, 'page_size': 10})
+        changes = resp.json()['changes']
+        self.assertEqual(
+            [(c['model'], c['id'], c['action']) for c in changes],
+            [('task', task.id, 'update'), ('block', block2_id, 'delete')],
+        )
+        self.assertEqual(changes[0]['data']['text'], '3')
+        self.assertIsNone(changes[1]['data'])
+        self.assertFalse(resp.json()['more'])
+
+        resp = client.get(url, {'since': resp.json()['seq']})
+        self.assertEqual(resp.json()['changes'], [])
+
+        # блок, перенесенный в другую доску, в ленте этой доски - удаление
+        since = resp.json()['seq']
+        block3 = Block.objects.create(name='3', id_board=board)
+        Block.objects.filter(id=block3.id).update(id_board=data['board2'])
+        resp = client.get(url, {'since': since})
+        changes = resp.json()['changes']
+        self.assertEqual(
+            [(c['model'], c['id'], c['action'], c['data']) for c in changes],
+            [('block', block3.id, 'delete', None)],
+        )
+
+        resp = client.get(url, {'since': 'abc'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        resp = client.get('/api/boards/' + str(data['board2'].id) + '/changes/')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+
+    # push-канал: изменение публикуется после коммита, за тик подписчик
+    # получает одно сообщение с последним изменением каждого объекта
+    def test_board_events(self):
+        data = BoardTests.setUpData()
+        board = data['board']
+
+        with mock.patch.object(events, 'get_broker') as get_broker:
+            with self.captureOnCommitCallbacks(execute=True):
+                block = Block.objects.create(name='1', id_board=board)
+        seq = Board.objects.get(id=board.id).version
+        get_broker.return_value.publish.assert_called_once_with(
+            board.id,
+            {
+                'seq': seq,
+                'changes': [
+                    {'seq': seq, 'model': 'block', 'id': block.id, 'action': 'insert'}
+                ],
+            },
+        )
+
+        # пакет изменений - одна публикация после коммита
+        with mock.patch.object(events, 'get_broker') as get_broker:
+            with self.captureOnCommitCallbacks(execute=True):
+                record_board_changes(board.id, 'task', [1, 2, 3], BoardChange.UPDATE)
+        [(id_board, batch)] = [
+            c.args for c in get_broker.return_value.publish.mock_calls
+        ]
+        self.assertEqual(batch['seq'], seq + 3)
+        self.assertEqual([c['id'] for c in batch['changes']], [1, 2, 3])
+
+        # для NOTIFY пакет делится на части с пределом размера
+        batch = {
+            'seq': 500,
+            'changes': [
+                {'seq': i, 'model': 'task', 'id': i, 'action': 'update'}
+                for i in range(1, 501)
+            ],
+        }
+        chunks = split_batch(batch, NOTIFY_CHANGES_BYTES)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            payload = json.dumps(dict(chunk, board=board.id), separators=(',', ':'))
+            self.assertLess(len(payload.encode()), 8000)
+        self.assertEqual(
+            [c for chunk in chunks for c in chunk['changes']], batch['changes']
+        )
+        self.assertEqual(chunks[-1]['seq'], 500)
+
+        broker = InProcessBroker()
+
+        async def receive_batches():
+            subscription = broker.subscribe(board.id)
+            other = broker.subscribe(data['board2'].id)
+            changes = [
+                {'seq': seq, 'model': 'task', 'id': 5, 'action': action}
+                for seq, action in ((1, 'insert'), (2, 'update'), (3, 'update'))
+            ]
+            broker.publish(board.id, {'seq': 3, 'changes': changes})
+            broker.publish(
+                board.id,
+                {
+                    'seq': 4,
+                    'changes': [
+                        {'seq': 4, 'model': 'block', 'id': 7, 'action': 'delete'}
+                    ],
+                },
+            )
+            batch = await subscription.next_batch(0.01)
+            other_batch = await other.next_batch(0.01, timeout=0.01)
+            subscription.close()
+            other.close()
+            return batch, other_batch
+
+        batch, other_batch = asyncio.run(receive_batches())
+        self.assertEqual(batch['seq'], 4)
+        self.assertEqual(
+            [(c['model'], c['id'], c['action']) for c in batch['changes']],
+            [('task', 5, 'update'), ('block', 7, 'delete')],
+        )
+        self.assertIsNone(other_batch)
+        self.assertEqual(broker._subscriptions, {})
+
+        # WebSocket без действительного токена закрывается
+        sent = []
+
+        async def receive():
+            return {'type': 'websocket.connect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'websocket',
+            'path': '/ws/boards/' + str(board.id) + '/',
+            'query_string': b'token=abc',
+        }
+        asyncio.run(websocket_application(scope, receive, send))
+        self.assertEqual(sent, [{'type': 'websocket.close', 'code': 4401}])
+
+        # SSE только под ASGI: под WSGI поток занял бы воркер навсегда
+        resp = self.client.get('/api/boards/' + str(board.id) + '/events/')
+        self.assertEqual(resp.status_code, 501)
+
+        # исключенный из доски получает закрытие канала со следующим событием
+        async def read_stream():
+            stream = sse_stream(board.id, 'token')
+            messages = [await stream.__anext__()]
+            change = {'seq': 5, 'model': 'task', 'id': 5, 'action': 'update'}
+            broker.publish(board.id, {'seq': 5, 'changes': [change]})
+            async for message in stream:
+                messages.append(message)
+            return messages
+
+        with mock.patch('managment.push.get_broker', return_value=broker), mock.patch(
+            'managment.push.get_board_member', return_value=(data['user'], False)
+        ), override_settings(BOARD_EVENTS_TICK=0.01):
+            messages = asyncio.run(read_stream())
+        self.assertEqual(
+            messages, [': connected\n\n', 'event: close\ndata: access denied\n\n']
+        )
+        self.assertEqual(broker._subscriptions, {})
+
+
 class BlockTests(APITestCase):
 
     @classmethod
@@ -1314,6 +1964,80 @@ class BlockTests(APITestCase):
         resp = client.get('/api/blocks/' + str(data['block2'].id) + '/')
         self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
 
+    # вставки в начало и в конец удлиняют ранг на символ
+    # только через каждые len(DIGITS) вставок
+    def test_rank_between_edges(self):
+        first = last = rank_between(None, None)
+        for _ in range(300):
+            rank = rank_between(None, first)
+            self.assertLess(rank, first)
+            first = rank
+            rank = rank_between(last, None)
+            self.assertGreater(rank, last)
+            last = rank
+        self.assertLessEqual(len(first), REBALANCE_LENGTH)
+        self.assertLessEqual(len(last), REBALANCE_LENGTH)
+        self.assertEqual(rank_between(None, '01'), '00z')
+
+    # перенос блока меняет только его ранг, порядок списка - по рангу
+    def test_api_block_move(self):
+        data = BlockTests.setUpData()
+        client = data['client']
+        block, block3 = data['block'], data['block3']
+        block4 = Block.objects.create(id_board=data['board'], name='4')
+
+        def order():
+            resp = client.get('/api/blocks/')
+            return [b['id'] for b in resp.json() if b['id_board'] == data['board'].id]
+
+        self.assertEqual(order(), [block.id, block3.id, block4.id])
+        ranks = dict(Block.objects.values_list('id', 'rank'))
+
+        url = '/api/blocks/' + str(block4.id) + '/move/'
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.patch(url, {'after': block.id, 'before': block3.id})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        updates = [
+            q['sql']
+            for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE "managment_block"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(order(), [block.id, block4.id, block3.id])
+        self.assertEqual(Block.objects.get(id=block.id).rank, ranks[block.id])
+        self.assertEqual(Block.objects.get(id=block3.id).rank, ranks[block3.id])
+
+        # один сосед: в начало
+        resp = client.patch(
+            '/api/blocks/' + str(block3.id) + '/move/', {'before': block.id}
+        )
+        self.assertEqual(order(), [block3.id, block.id, block4.id])
+
+        # без соседей: в конец
+        resp = client.patch('/api/blocks/' + str(block3.id) + '/move/', {})
+        self.assertEqual(order(), [block.id, block4.id, block3.id])
+
+        resp = client.patch(url, {'after': data['block2'].id})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = client.patch(url, {'after': block3.id, 'before': block.id})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = client.patch('/api/blocks/' + str(data['block2'].id) + '/move/', {})
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+        # частые переносы в одно место удлиняют ранги, выравнивание сохраняет порядок
+        for i in range(30):
+            moved = block4 if i % 2 else block3
+            client.patch('/api/blocks/' + str(moved.id) + '/move/', {'after': block.id})
+        expected = order()
+        self.assertGreater(
+            max(len(rank) for rank in Block.objects.values_list('rank', flat=True)), 2
+        )
+        call_command('rebalance_block_ranks', length=2, stdout=io.StringIO())
+        self.assertEqual(order(), expected)
+        self.assertEqual(
+            max(len(rank) for rank in Block.objects.values_list('rank', flat=True)), 1
+        )
+
     # только с ролью или админ, чужие нельзя
     def test_api_block_delete(self):
         data = BlockTests.setUpData()
@@ -1767,6 +2491,566 @@ class TaskTests(APITestCase):
         data['user_board1'].save()
 
 
+    # быстрая сериализация списков совпадает с ModelSerializer
+    def test_serialize_rows(self):
+        data = TaskTests.setUpData()
+        Comment.objects.create(id_user=data['user'], id_task=data['task1'], text='1')
+
+        cases = [
+            (TaskSerializer, Task.objects.all()),
+            (BoardSerializer, Board.objects.all()),
+            (ExtUserSerializer, User.objects.all()),
+        ]
+        for serializer_class, queryset in cases:
+            self.assertEqual(
+                serialize_rows(serializer_class, queryset),
+                serializer_class(queryset, many=True).data,
+            )
+
+    # доска задачи и комментариев берется из блока
+    def test_task_comment_id_board(self):
+        data = TaskTests.setUpData()
+
+        self.assertEqual(data['task1'].id_board_id, data['board'].id)
+        comment = Comment.objects.create(
+            id_user=data['user'], id_task=data['task1'], text='1'
+        )
+        self.assertEqual(comment.id_board_id, data['board'].id)
+
+    # блок и статус задачи из другой доски отклоняются БД с ответом 400
+    def test_api_task_same_board_constraint(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+
+        data['user_role1'].editing_task = True
+        data['user_role1'].creating_task = True
+        data['user_role1'].save()
+        data['user_board2'].id_user = data['user']
+        data['user_board2'].save()
+
+        resp = client.patch(
+            '/api/tasks/' + str(data['task1'].id) + '/',
+            {'id_block': data['block2'].id},
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        resp = client.patch(
+            '/api/tasks/' + str(data['task1'].id) + '/',
+            {'id_status_task': data['status_task2'].id},
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        resp = client.post(
+            '/api/tasks/',
+            {
+                'text': 'abc',
+                'id_block': data['block1'].id,
+                'id_status_task': data['status_task2'].id,
+            },
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        task = Task.objects.get(id=data['task1'].id)
+        self.assertEqual(task.id_block_id, data['block1'].id)
+        self.assertEqual(task.id_status_task_id, data['status_task1'].id)
+
+        block = Block.objects.get(id=data['block1'].id)
+        block.id_board = data['board2']
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                block.save()
+
+    # задача выбирается вместе с участием в доске, отдельного запроса к UserBoard нет
+    def test_api_task_membership_scoped_queryset(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+
+        # пользователь из токена + задача с участием
+        with self.assertNumQueries(2):
+            resp = client.get('/api/tasks/' + str(data['task2'].id) + '/')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get('/api/tasks/' + str(data['task1'].id) + '/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            any(
+                q['sql'].startswith('SELECT "managment_userboard"')
+                for q in queries.captured_queries
+            )
+        )
+
+    # участие в доске загружается один раз на запрос для permission-классов и view
+    def test_api_task_membership_queries(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+
+        data['user_role1'].editing_task = True
+        data['user_role1'].save()
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.patch(
+                '/api/tasks/' + str(data['task1'].id) + '/',
+                {'text': 'abc', 'id_block': data['block1_2'].id},
+            )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        membership_queries = [
+            q for q in queries.captured_queries if 'managment_userboard' in q['sql']
+        ]
+        self.assertEqual(len(membership_queries), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get('/api/tasks/' + str(data['task1'].id) + '/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        membership_queries = [
+            q for q in queries.captured_queries if 'managment_userboard' in q['sql']
+        ]
+        self.assertEqual(len(membership_queries), 1)
+
+
+    # страницы по ключу id: ссылка на следующую в заголовке Link,
+    # дальняя страница стоит столько же запросов, сколько первая
+    def test_api_task_keyset_pagination(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+
+        for i in range(5):
+            Task.objects.create(
+                text=str(i),
+                id_block=data['block1'],
+                id_status_task=data['status_task1'],
+            )
+        expected = list(
+            Task.objects.filter(id_block=data['block1'])
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+        url = (
+            '/api/tasks/' + str(data['block1'].id) + '/get_by_id_block/?page_size=3'
+        )
+        ids = []
+        query_counts = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                resp = client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertIsInstance(resp.json(), list)
+            ids += [task['id'] for task in resp.json()]
+            query_counts.append(len(queries))
+
+            link = resp.headers.get('Link')
+            url = link[1 : link.index('>')] if link else None
+
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(query_counts), 3)
+        self.assertEqual(len(set(query_counts)), 1)
+
+        resp = client.get('/api/tasks/?cursor=abc')
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+
+    # FastJSONRenderer (orjson и запасной json) выдает те же байты, что JSONRenderer
+    def test_fast_json_renderer(self):
+        data = {
+            'date': datetime.date(2024, 1, 2),
+            'datetime': datetime.datetime(
+                2024, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc
+            ),
+            'decimal': decimal.Decimal('1.50'),
+            'uuid': uuid.UUID(int=1),
+            'text': 'задача \u2028',
+            'lazy': gettext_lazy('text'),
+            1: [None, True, 1.5],
+        }
+        expected = JSONRenderer().render(data)
+
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+
+        body = io.BytesIO('{"text": "задача", "id": [1, 2.5]}'.encode())
+        self.assertEqual(
+            FastJSONParser().parse(body), {'text': 'задача', 'id': [1, 2.5]}
+        )
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"id": NaN}'))
+
+
+    # ?fields= сужает выдачу и колонки в SQL, незапрошенные связи не загружаются
+    def test_api_task_sparse_fields(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get(
+                '/api/tasks/' + str(data['block1'].id) + '/get_by_id_block/',
+                {'fields': 'text,unknown'},
+            )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            resp.json(),
+            [
+                {'rank': data['task1'].rank, 'id': data['task1'].id, 'text': '1'},
+                {'rank': data['task1_2'].rank, 'id': data['task1_2'].id, 'text': '1_2'},
+            ],
+        )
+        sql = ' '.join(q['sql'] for q in queries.captured_queries)
+        self.assertNotIn('description', sql)
+        self.assertNotIn('managment_comment', sql)
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get(
+                '/api/tasks/' + str(data['task1'].id) + '/', {'fields': 'text'}
+            )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json(), {'text': '1'})
+        sql = ' '.join(q['sql'] for q in queries.captured_queries)
+        self.assertNotIn('description', sql)
+        self.assertNotIn('managment_comment', sql)
+
+
+    # ETag по версии доски: 304 без сериализации и чтения комментариев,
+    # любое изменение в доске меняет ETag
+    def test_api_task_etag(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+        url = '/api/tasks/' + str(data['task1'].id) + '/'
+
+        resp = client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        etag = resp['ETag']
+        self.assertTrue(resp.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(resp['ETag'], etag)
+        # пользователь токена и задача вместе с версией доски и участием
+        self.assertEqual(len(queries), 2)
+        sql = ' '.join(q['sql'] for q in queries.captured_queries)
+        self.assertNotIn('managment_comment', sql)
+
+        block_url = '/api/tasks/' + str(data['block1'].id) + '/get_by_id_block/'
+        resp = client.get(block_url)
+        self.assertEqual(resp['ETag'], etag)
+        resp = client.get(block_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Comment.objects.create(
+            id_user=data['user'], id_task=data['task1_2'], text='1'
+        )
+        resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp['ETag'], etag)
+
+        # чужая доска: 403 без ETag
+        resp = client.get('/api/tasks/' + str(data['task2'].id) + '/')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(resp.has_header('ETag'))
+
+    # пакет задач: число запросов не зависит от размера пакета
+    def test_api_task_bulk(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+        role = data['user_role1']
+        role.creating_task = True
+        role.editing_task = True
+        role.save()
+        board = data['board']
+        version = Board.objects.get(id=board.id).version
+
+        items = [
+            {
+                'id_block': data['block1'].id,
+                'id_status_task': data['status_task1'].id,
+                'text': str(i),
+            }
+            for i in range(20)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.post('/api/tasks/bulk_create/', items, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(resp.data), 20)
+        self.assertLessEqual(len(queries), 16)
+        self.assertEqual(Task.objects.filter(id_block=data['block1']).count(), 22)
+        self.assertEqual(Board.objects.get(id=board.id).version, version + 20)
+
+        # перенос всех задач в другой блок
+        moves = [
+            {'id': task['id'], 'id_block': data['block1_2'].id} for task in resp.data
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.patch('/api/tasks/bulk_update/', moves, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(queries), 15)
+        self.assertEqual(Task.objects.filter(id_block=data['block1_2']).count(), 20)
+        self.assertEqual(Board.objects.get(id=board.id).version, version + 40)
+        last = BoardChange.objects.filter(id_board=board).order_by('-seq')[:20]
+        self.assertEqual({change.action for change in last}, {BoardChange.UPDATE})
+
+        # чужая доска
+        resp = client.patch(
+            '/api/tasks/bulk_update/',
+            [{'id': data['task2'].id, 'text': 'x'}],
+            format='json',
+        )
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+        # задачи разных досок в одном пакете
+        resp = client.patch(
+            '/api/tasks/bulk_update/',
+            [
+                {'id': data['task1'].id, 'text': 'x'},
+                {'id': data['task2'].id, 'text': 'y'},
+            ],
+            format='json',
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Task.objects.get(id=data['task1'].id).text, '1')
+
+        # слишком большой пакет отклоняется до валидации
+        resp = client.post('/api/tasks/bulk_create/', [{}] * 501, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(resp.json(), ['at most 500 tasks per request'])
+
+    # перенос в другой блок, статус и место - одним запросом и одним UPDATE задачи
+    def test_api_task_move(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+        task1, task1_2 = data['task1'], data['task1_2']
+        block1_2 = data['block1_2']
+        status_task = StatusTask.objects.create(name='3', id_board=data['board'])
+        task3 = Task.objects.create(
+            text='3', id_block=block1_2, id_status_task=status_task
+        )
+        task4 = Task.objects.create(
+            text='4', id_block=block1_2, id_status_task=status_task
+        )
+
+        def order(block):
+            resp = client.get('/api/tasks/' + str(block.id) + '/get_by_id_block/')
+            return [task['id'] for task in resp.json()]
+
+        url = '/api/tasks/' + str(task1.id) + '/move/'
+        move = {
+            'id_block': block1_2.id,
+            'id_status_task': status_task.id,
+            'after': task3.id,
+        }
+        resp = client.patch(url, move, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+        data['user_role1'].editing_task = True
+        data['user_role1'].save()
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.patch(url, move, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        updates = [
+            q['sql']
+            for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE "managment_task"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(resp.data['id_status_task'], status_task.id)
+        self.assertEqual(order(block1_2), [task3.id, task1.id, task4.id])
+        self.assertEqual(order(data['block1']), [task1_2.id])
+
+        # внутри блока, перед первой задачей
+        resp = client.patch(
+            '/api/tasks/' + str(task4.id) + '/move/',
+            {'before': task3.id},
+            format='json',
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(order(block1_2), [task4.id, task3.id, task1.id])
+
+        # блок чужой доски отклоняет БД, задача не меняется
+        resp = client.patch(url, {'id_block': data['block2'].id}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Task.objects.get(id=task1.id).id_block_id, block1_2.id)
+
+        # сосед не из нового блока
+        resp = client.patch(
+            url, {'id_block': data['block1'].id, 'after': task3.id}, format='json'
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    # поиск только по своим доскам, с подсветкой и ранжированием
+    def test_api_search(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+        task = Task.objects.create(
+            text='release <b>', description='prepare release notes',
+            id_block=data['block1'], id_status_task=data['status_task1'],
+        )
+        Task.objects.create(
+            text='other', description='release later',
+            id_block=data['block1'], id_status_task=data['status_task1'],
+        )
+        Task.objects.create(text='release', id_block=data['block2'], id_status_task=data['status_task2'])
+        comment = Comment.objects.create(id_user=data['user'], id_task=task, text='Release готов')
+
+        resp = client.get('/api/search/', {'q': 'release'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        results = resp.json()
+        self.assertEqual({r['id_board'] for r in results}, {data['board'].id})
+        self.assertEqual(len(results), 3)
+        # совпадение в text и description выше, чем только в description
+        tasks = [r for r in results if r['type'] == 'task']
+        self.assertEqual(tasks[0]['id'], task.id)
+        self.assertGreater(tasks[0]['score'], tasks[1]['score'])
+        self.assertEqual(tasks[0]['highlight']['text'], '<mark>release</mark> &lt;b&gt;')
+
+        resp = client.get('/api/search/', {'q': 'готов', 'type': 'comment'})
+        self.assertEqual(
+            [(r['type'], r['id'], r['id_task']) for r in resp.json()],
+            [('comment', comment.id, task.id)],
+        )
+
+        # индекс следует за изменениями и удалением
+        task.text = 'renamed'
+        task.description = ''
+        task.save()
+        resp = client.get('/api/search/', {'q': 'release', 'type': 'task'})
+        self.assertNotIn(task.id, [r['id'] for r in resp.json()])
+        resp = client.get('/api/search/', {'q': 'renamed'})
+        self.assertEqual([r['id'] for r in resp.json()], [task.id])
+
+        resp = client.get('/api/search/', {'q': 'release', 'board': data['board2'].id})
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+        resp = client.get('/api/search/', {'q': ''})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = client.get('/api/search/', {'q': '"*'})
+        self.assertEqual(resp.json(), [])
+
+    def test_api_search_tasks_fuzzy(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+        task = Task.objects.create(
+            text='Prepare release',
+            id_block=data['block1'],
+            id_status_task=data['status_task1'],
+        )
+        notes = Task.objects.create(
+            text='Release notes',
+            id_block=data['block1'],
+            id_status_task=data['status_task1'],
+        )
+        Task.objects.create(
+            text='release', id_block=data['block2'], id_status_task=data['status_task2']
+        )
+
+        # опечатка в запросе, задачи чужой доски не находятся
+        resp = client.get('/api/search/tasks/', {'q': 'relase'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        results = resp.json()
+        # при равном score выше название, ближе к запросу целиком
+        self.assertEqual([r['id'] for r in results], [notes.id, task.id])
+        self.assertEqual({r['id_board'] for r in results}, {data['board'].id})
+        self.assertEqual(
+            client.get('/api/search/tasks/', {'q': 'relase', 'limit': 1}).json(),
+            results[:1],
+        )
+
+        # комментарий не сбрасывает индекс доски, изменение задачи - сбрасывает
+        board = data['board']
+        index = trigram_indexes.get([board.id])[board.id]
+        Comment.objects.create(id_user=data['user'], id_task=task, text='x')
+        self.assertIs(trigram_indexes.get([board.id])[board.id], index)
+        task.text = 'Deploy'
+        task.save()
+        resp = client.get('/api/search/tasks/', {'q': 'deploi'})
+        self.assertEqual([r['id'] for r in resp.json()], [task.id])
+        resp = client.get('/api/search/tasks/', {'q': 'relase'})
+        self.assertNotIn(task.id, [r['id'] for r in resp.json()])
+
+        resp = client.get(
+            '/api/search/tasks/', {'q': 'relase', 'board': data['board2'].id}
+        )
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def assertUsesIndex(self, sql, index):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn(index, plan)
+
+    def test_api_task_filters(self):
+        data = TaskTests.setUpData()
+        client = data['client']
+        done = StatusTask.objects.create(name='done', id_board=data['board'])
+        dates = ['2020-01-05', '2020-01-10', '2020-01-10', '2020-02-01']
+        tasks = [
+            Task.objects.create(
+                text=str(i),
+                id_block=data['block1_2'],
+                id_status_task=done,
+                date=datetime.date.fromisoformat(date),
+            )
+            for i, date in enumerate(dates)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get(
+                '/api/tasks/',
+                {
+                    'board': data['board'].id,
+                    'date_after': '2020-01-06',
+                    'date_before': '2020-02-01',
+                },
+            )
+        self.assertEqual([t['id'] for t in resp.json()], [t.id for t in tasks[1:]])
+        [sql] = [
+            q['sql'] for q in queries.captured_queries if 'managment_task' in q['sql']
+        ]
+        self.assertUsesIndex(sql, 'task_board_date_idx')
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get(
+                '/api/tasks/', {'id_status_task': done.id, 'ordering': 'date'}
+            )
+        self.assertEqual([t['id'] for t in resp.json()], [t.id for t in tasks])
+        [sql] = [
+            q['sql'] for q in queries.captured_queries if 'managment_task' in q['sql']
+        ]
+        self.assertUsesIndex(sql, 'task_status_date_idx')
+
+        # страницы по убыванию даты, при равной дате - по убыванию id
+        ids = []
+        url = '/api/tasks/?id_block=%s,%s&ordering=-date&page_size=1' % (
+            data['block1_2'].id,
+            data['block2'].id,
+        )
+        while url:
+            resp = client.get(url)
+            ids += [t['id'] for t in resp.json()]
+            link = resp.headers.get('Link')
+            url = link[1 : link.index('>')] if link else None
+        self.assertEqual(ids, [tasks[3].id, tasks[2].id, tasks[1].id, tasks[0].id])
+
+        resp = client.get('/api/tasks/', {'board': data['board2'].id})
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+        resp = client.get('/api/tasks/', {'date_after': '2020-13-01'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = client.get('/api/tasks/', {'ordering': 'text'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # параметры списка не влияют на операции с одной задачей
+        url = '/api/tasks/' + str(tasks[0].id) + '/'
+        resp = client.get(url, {'board': data['board2'].id, 'ordering': 'text'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        resp = client.get(url + '?date_after=2021-01-01')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+
 class CommentTests(APITestCase):
     @classmethod
     def setUpData(cls):
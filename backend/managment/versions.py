@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .events import publish_board_changes
+from .models import Board, BoardChange
+
+# Версия доски: счетчик Board.version растет при любом изменении доски
+# и ее объектов (signals.py). ETag ответов строится из версии, поэтому
+# If-None-Match проверяется без сериализации и без чтения дочерних строк.
+
+
+def bump_board_version(*boards_id):
+    boards_id = {id_board for id_board in boards_id if id_board is not None}
+    if boards_id:
+        Board.objects.filter(id__in=boards_id).update(
+            version=F('version') + 1, updated_at=timezone.now()
+        )
+
+
+# изменение объекта доски: версия растет, новая версия - seq записи журнала.
+# UPDATE держит блокировку строки доски до конца транзакции, поэтому seq
+# прочитанный следом принадлежит этому изменению.
+def record_board_change(id_board, instance, action):
+    record_board_objects(id_board, [instance], action)
+
+
+# несколько объектов одной модели
+def record_board_changes(id_board, model, objects_id, action):
+    _record(id_board, [(model, object_id) for object_id in objects_id], action)
+
+
+# объекты разных моделей одной доски
+def record_board_objects(id_board, objects, action, publish=True):
+    changes = [(obj._meta.model_name, obj.pk) for obj in objects]
+    _record(id_board, changes, action, publish)
+
+
+# версия растет сразу на число изменений, журнал пишется одним INSERT
+def _record(id_board, changes, action, publish=True):
+    if id_board is None or not changes:
+        return
+
+    with transaction.atomic():
+        Board.objects.filter(id=id_board).update(
+            version=F('version') + len(changes), updated_at=timezone.now()
+        )
+        last_seq = Board.objects.filter(id=id_board).values_list('version', flat=True)
+        last_seq = last_seq.first()
+        if last_seq is None:
+            return
+
+        first_seq = last_seq - len(changes) + 1
+        BoardChange.objects.bulk_create(
+            [
+                BoardChange(
+                    id_board_id=id_board,
+                    seq=first_seq + i,
+                    model=model,
+                    object_id=object_id,
+                    action=action,
+                )
+                for i, (model, object_id) in enumerate(changes)
+            ]
+        )
+        if publish:
+            publish_board_changes(
+                id_board,
+                [
+                    {
+                        'seq': first_seq + i,
+                        'model': model,
+                        'id': object_id,
+                        'action': action,
+                    }
+                    for i, (model, object_id) in enumerate(changes)
+                ],
+            )
+
+
+def board_etag(id_board, version):
+    return '"board-%s-%s"' % (id_board, version)
+
+
+# board_field - путь до доски у модели ('id' у самой доски)
+def annotate_board_version(queryset, board_field):
+    prefix = '' if board_field == 'id' else board_field + '__'
+    return queryset.annotate(
+        board_version=F(prefix + 'version'),
+        board_updated_at=F(prefix + 'updated_at'),
+    )
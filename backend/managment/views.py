@@ -6,18 +6,46 @@ from django.contrib.auth.password_validation import re
 from django.core import serializers
 from django.core.serializers.base import SerializationError
 from django.core.serializers.json import Serializer
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Prefetch, prefetch_related_objects
 from django.db.models.fields.related import resolve_relation
 from django.http import JsonResponse
 from django.shortcuts import render
 from django.urls import is_valid_path
+from django.utils.cache import get_conditional_response
 from django.utils.formats import sanitize_separators
+from django.utils.http import http_date
 from django.utils.text import add_truncation_text
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
-
-from .models import Block, Board, Comment, StatusTask, Task, User, UserBoard, UserRole
+from rest_framework.viewsets import ModelViewSet, ViewSet
+
+from .boards import clone_board, create_board, delete_board
+from .bulk import check_batch_size, create_tasks, update_tasks
+from .changes import get_board_changes
+from .filters import TaskFilterBackend
+from .fuzzy import FUZZY_LIMIT, FUZZY_MAX_LIMIT, find_tasks
+from .membership import (
+    annotate_membership,
+    get_user_board,
+    get_user_board_ids,
+    prime_membership,
+)
+from .models import (
+    Block,
+    Board,
+    BoardChange,
+    Comment,
+    StatusTask,
+    Task,
+    User,
+    UserBoard,
+    UserRole,
+)
+from .moves import move_block, move_task
+from .pagination import KeysetPagination
 from .permissions import (
     IsAdminOrReadOnly,
     IsOwnerCommentOrRole,
@@ -30,22 +58,172 @@ from .permissions import (
     IsUserRoleCanCRUDStatusTask,
     IsUserRoleCanCRUDUserRole,
 )
+from .projections import only_fields, serialize_rows
+from .search import SEARCH_KINDS, SEARCH_LIMIT, SEARCH_MAX_LIMIT, search
 from .serializers import (
+    BlockMoveSerializer,
     BlockSerializer,
+    BoardCloneSerializer,
+    BoardCreateSerializer,
     BoardSerializer,
+    BoardSnapshotSerializer,
+    BulkTaskSerializer,
     CommentSerializer,
     ExtUserSerializer,
     StatusTaskSerializer,
+    TaskMoveSerializer,
     TaskSerializer,
     UpdateUserSerializer,
     UserBoardSerializer,
     UserRoleSerializer,
     UserSerializer,
 )
+from .streaming import stream_rows
+from .versions import annotate_board_version, board_etag, record_board_change
+
+
+# Блок и статус задачи должны быть из ее доски, это проверяет БД (db_constraints.py).
+# Нарушение возвращается как 400 без дополнительных запросов на проверку.
+def save_on_same_board(serializer, message):
+    previous_id_board = getattr(serializer.instance, 'id_board_id', None)
+    try:
+        with transaction.atomic():
+            serializer.save()
+    except IntegrityError:
+        raise ValidationError(message)
+
+    # для прежней доски перенос - удаление объекта
+    if previous_id_board != serializer.instance.id_board_id:
+        record_board_change(previous_id_board, serializer.instance, BoardChange.DELETE)
+
+
+# Объект выбирается вместе с участием пользователя в его доске, поэтому
+# проверки доступа в permission-классах и retrieve не делают отдельный запрос.
+# Объекты удаленных досок (boards.delete_board) до очистки не видны никому.
+class MembershipScopedMixin:
+    board_field = 'id_board'
+
+    def get_queryset(self):
+        queryset = self.live_boards(super().get_queryset())
+        return annotate_membership(queryset, self.request.user, self.board_field)
+
+    # без объектов удаленных досок; для списков, не ограниченных досками
+    # пользователя
+    def live_boards(self, queryset):
+        deleted_at = 'deleted_at'
+        if self.board_field != 'id':
+            deleted_at = self.board_field + '__deleted_at'
+        return queryset.filter(**{deleted_at + '__isnull': True})
+
+    def check_object_permissions(self, request, obj):
+        if self.board_field == 'id':
+            id_board = obj.id
+        else:
+            id_board = getattr(obj, self.board_field + '_id')
+
+        prime_membership(request, obj, id_board)
+        super().check_object_permissions(request, obj)
+
+
+# ETag/Last-Modified по версии доски (versions.py). Для retrieve версия
+# выбирается вместе с объектом, If-None-Match отвечается 304 до сериализации.
+class BoardVersionMixin:
+    board_field = 'id_board'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('retrieve', 'snapshot'):
+            queryset = annotate_board_version(queryset, self.board_field)
+        return queryset
+
+    def object_not_modified(self, instance):
+        if self.board_field == 'id':
+            id_board = instance.id
+        else:
+            id_board = getattr(instance, self.board_field + '_id')
+        return self.not_modified(
+            id_board, instance.board_version, instance.board_updated_at
+        )
+
+    def board_not_modified(self, id_board):
+        row = Board.objects.values_list('version', 'updated_at').filter(id=id_board)
+        row = row.first()
+        if row is None:
+            return None
+        return self.not_modified(id_board, *row)
+
+    # вызывается после проверки доступа, возвращает 304 или None
+    def not_modified(self, id_board, version, updated_at):
+        self.board_validators = (board_etag(id_board, version), updated_at)
+        return get_conditional_response(
+            self.request,
+            etag=self.board_validators[0],
+            last_modified=int(updated_at.timestamp()),
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'board_validators', None)
+        if validators and response.status_code in (200, 304):
+            response['ETag'] = validators[0]
+            response['Last-Modified'] = http_date(validators[1].timestamp())
+        return response
+
+
+# ?fields=id,text в GET-запросах: в ответе только эти поля, из БД читаются
+# только их колонки, незапрошенные обратные связи не загружаются
+class SparseFieldsMixin:
+    fields_query_param = 'fields'
+
+    @property
+    def requested_fields(self):
+        value = self.request.query_params.get(self.fields_query_param)
+        if self.request.method != 'GET' or not value:
+            return None
+        return tuple(name.strip() for name in value.split(',') if name.strip())
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve' and self.requested_fields:
+            queryset = only_fields(
+                queryset, self.get_serializer_class(), self.requested_fields
+            )
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'retrieve' and self.requested_fields:
+            kwargs['fields'] = self.requested_fields
+        return super().get_serializer(*args, **kwargs)
+
+
+# Списки отдаются страницами по ключу keyset_ordering, см. pagination.py.
+# С ?stream=1 весь список отдается потоком без страниц, см. streaming.py
+class KeysetPaginatedMixin(SparseFieldsMixin):
+    keyset_ordering = ('id',)
+    stream_query_param = 'stream'
+
+    def paginated_rows(self, serializer_class, queryset, ordering=None):
+        ordering = ordering or self.keyset_ordering
+        # поля ключа страницы нужны для курсора, поэтому отдаются всегда
+        fields = self.requested_fields
+        if fields:
+            fields = tuple(field.lstrip('-') for field in ordering) + fields
+
+        if self.request.query_params.get(self.stream_query_param) in ('1', 'true'):
+            return stream_rows(serializer_class, queryset.order_by(*ordering), fields)
+
+        items, headers = KeysetPagination(ordering).paginate_rows(
+            self.request, serializer_class, queryset, fields
+        )
+        return Response(items, status.HTTP_200_OK, headers=headers)
+
+
+TASK_BOARD_MESSAGE = 'id_block and id_status_task must belong to the board of the task'
+MOVE_WITH_TASKS_MESSAGE = 'id_board can not be changed while there are tasks'
 
 
 # User
-class UserAPIView(ModelViewSet):
+class UserAPIView(KeysetPaginatedMixin, ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsUserOrReadOnly]
@@ -55,21 +233,22 @@ class UserAPIView(ModelViewSet):
         user = request.user
         usr = self.queryset.get(id=pk)
 
+        fields = self.requested_fields
+
         #! if необычный
         if user.id == usr.id:
-            serializer = UserSerializer(usr)
+            serializer = UserSerializer(usr, fields=fields)
             return Response(serializer.data)
 
         if user.is_superuser:
-            serializer = UserSerializer(usr)
+            serializer = UserSerializer(usr, fields=fields)
             return Response(serializer.data)
 
-        serializer = ExtUserSerializer(usr)
+        serializer = ExtUserSerializer(usr, fields=fields)
         return Response(serializer.data)
 
     def list(self, request):
-        serializer = ExtUserSerializer(self.queryset, many=True)
-        return Response(serializer.data)
+        return self.paginated_rows(ExtUserSerializer, self.queryset)
 
     def partial_update(self, request, pk=None):
         user = request.user
@@ -84,7 +263,7 @@ class UserAPIView(ModelViewSet):
                 return Response(serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = UpdateUserSerializer(user, data=request.data, partial=True)
+        serializer = UpdateUserSerializer(usr, data=request.data, partial=True)
         if serializer.is_valid(raise_exception=True):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -103,7 +282,7 @@ class UserAPIView(ModelViewSet):
                 serializer.save()
                 return Response(serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        serializer = UpdateUserSerializer(user, data=request.data)
+        serializer = UpdateUserSerializer(usr, data=request.data)
         if serializer.is_valid(raise_exception=True):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -125,48 +304,55 @@ class UserAPIView(ModelViewSet):
 
 
 # StatusTask
-class StatusTaskAPIView(ModelViewSet):
+class StatusTaskAPIView(
+    MembershipScopedMixin, BoardVersionMixin, KeysetPaginatedMixin, ModelViewSet
+):
     queryset = StatusTask.objects.all()
     serializer_class = StatusTaskSerializer
     permission_classes = [IsUserRoleCanCRUDStatusTask]
 
+    def perform_update(self, serializer):
+        save_on_same_board(serializer, MOVE_WITH_TASKS_MESSAGE)
+
     def list(self, request):
-        boards_id = UserBoard.objects.filter(id_user=request.user.id).values_list(
-            'id_board'
-        )
+        boards_id = get_user_board_ids(request.user.id)
         result = self.queryset.filter(id_board__in=boards_id)
-        serializer = self.get_serializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(self.get_serializer_class(), result)
 
     # вывод только тех досок, в которых есть пользователь
     def retrieve(self, request, pk=None):
         instance = self.get_object()
 
-        check_id_board = UserBoard.objects.filter(
-            id_board=instance.id_board, id_user=request.user.id
-        ).first()
+        check_id_board = get_user_board(request, instance.id_board_id)
 
         if not check_id_board:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
 
+        not_modified = self.object_not_modified(instance)
+        if not_modified:
+            return not_modified
+
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def get_by_id_board(self, request, pk=None):
-        check_pk = UserBoard.objects.filter(id_board=pk, id_user=request.user.id)
+        check_pk = get_user_board(request, pk)
         if not check_pk:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
 
+        not_modified = self.board_not_modified(pk)
+        if not_modified:
+            return not_modified
+
         instance = self.queryset.filter(id_board=pk)
-        serializer = self.get_serializer(data=instance, many=True)
-        serializer.is_valid()
-        return Response(serializer.data)
+        return self.paginated_rows(self.get_serializer_class(), instance)
 
 
 # UserRole
-class UserRoleAPIView(ModelViewSet):
+class UserRoleAPIView(
+    MembershipScopedMixin, BoardVersionMixin, KeysetPaginatedMixin, ModelViewSet
+):
     queryset = UserRole.objects.all()
     serializer_class = UserRoleSerializer
     permission_classes = [IsUserRoleCanCRUDUserRole]
@@ -174,41 +360,44 @@ class UserRoleAPIView(ModelViewSet):
     # получение ролей определенной доски, в которой состоит пользователь
     @action(detail=True, methods=['get'])
     def get_by_id_board(self, request, pk=None):
-        check_pk = UserBoard.objects.filter(id_board=pk, id_user=request.user.id)
+        check_pk = get_user_board(request, pk)
         if not check_pk:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
+
+        not_modified = self.board_not_modified(pk)
+        if not_modified:
+            return not_modified
+
         result = self.queryset.filter(id_board=pk)
 
-        serializer = UserRoleSerializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(UserRoleSerializer, result)
 
     def list(self, request):
-        boards_id = UserBoard.objects.filter(id_user=request.user.id).values_list(
-            'id_board'
-        )
+        boards_id = get_user_board_ids(request.user.id)
         result = self.queryset.filter(id_board__in=boards_id)
-        serializer = UserRoleSerializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(UserRoleSerializer, result)
 
     # вывод только тех досок, в которых есть пользователь
     def retrieve(self, request, pk):
         instance = self.get_object()
 
-        check_id_board = UserBoard.objects.filter(
-            id_board=instance.id_board, id_user=request.user.id
-        ).first()
+        check_id_board = get_user_board(request, instance.id_board_id)
 
         if not check_id_board:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
 
+        not_modified = self.object_not_modified(instance)
+        if not_modified:
+            return not_modified
+
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
 
 # UserBoard
-class UserBoardAPIView(ModelViewSet):
+class UserBoardAPIView(
+    MembershipScopedMixin, BoardVersionMixin, KeysetPaginatedMixin, ModelViewSet
+):
     queryset = UserBoard.objects.all()
     serializer_class = UserBoardSerializer
     permission_classes = [IsUserOrUserRoleCanEditDelete]
@@ -216,142 +405,168 @@ class UserBoardAPIView(ModelViewSet):
     # вывод только тех досок, в которых есть пользователь
     def retrieve(self, request, pk=None):
         instance = self.get_object()
-        check_in_board = self.queryset.filter(
-            id_board=instance.id_board, id_user=request.user.id
-        )
+        check_in_board = get_user_board(request, instance.id_board_id)
 
         if not check_in_board:
             return Response('acces denied', status.HTTP_403_FORBIDDEN)
 
+        not_modified = self.object_not_modified(instance)
+        if not_modified:
+            return not_modified
+
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
     # вывод только пользователей, которые состоят в твоих досках и твои доски
     def list(self, request):
-        boards = self.queryset.filter(id_user=request.user.id).values_list('id_board')
+        boards = get_user_board_ids(request.user.id)
         result = self.queryset.filter(id_board__in=boards)
 
-        serializer = UserBoardSerializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(UserBoardSerializer, result)
 
     # получение user_boards по id_board, показывает доски те, в которых состоит пользователь и его доски
     @action(detail=True, methods=['get'])
     def get_by_id_board(self, request, pk=None):
-        check_pk = self.queryset.filter(id_board=pk, id_user=request.user.id)
+        check_pk = get_user_board(request, pk)
         if not check_pk:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
+
+        not_modified = self.board_not_modified(pk)
+        if not_modified:
+            return not_modified
+
         user_boards = self.queryset.filter(id_board=pk)
-        serializer = UserBoardSerializer(data=user_boards, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(UserBoardSerializer, user_boards)
 
 
 # Board
-class BoardAPIView(ModelViewSet):
-    queryset = Board.objects.all()
+class BoardAPIView(
+    MembershipScopedMixin, BoardVersionMixin, KeysetPaginatedMixin, ModelViewSet
+):
+    queryset = Board.objects.filter(deleted_at__isnull=True)
     serializer_class = BoardSerializer
     permission_classes = [IsUserRelateToBoardOrReadOnly]
+    board_field = 'id'
+
+    # отметка удаления и отключение участников, строки удаляются позже
+    def perform_destroy(self, instance):
+        delete_board(instance)
+
+    # доска, блоки по порядку, задачи с числом комментариев, статусы, роли и участники
+    @action(detail=True, methods=['get'])
+    def snapshot(self, request, pk=None):
+        instance = self.get_object()
+
+        if not get_user_board(request, instance.id):
+            return Response('access denied', status.HTTP_403_FORBIDDEN)
+
+        not_modified = self.object_not_modified(instance)
+        if not_modified:
+            return not_modified
+
+        # фиксированное число запросов независимо от размера доски
+        blocks = Block.objects.order_by('rank', 'id').prefetch_related(
+            Prefetch(
+                'tasks',
+                queryset=Task.objects.only('id', 'id_block').order_by('rank', 'id'),
+            )
+        )
+        tasks = Task.objects.annotate(comments_count=Count('comments')).order_by('id')
+        prefetch_related_objects(
+            [instance],
+            Prefetch('board', queryset=blocks),
+            Prefetch('tasks', queryset=tasks),
+            Prefetch('status_tasks', queryset=StatusTask.objects.order_by('id')),
+            Prefetch('roles', queryset=UserRole.objects.order_by('id')),
+            Prefetch('users', queryset=UserBoard.objects.order_by('id')),
+        )
+
+        serializer = BoardSnapshotSerializer(instance)
+        return Response(serializer.data)
+
+    # копия доски как шаблона: {name?, tasks?}, только администратор доски
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        source = self.get_object()
+        serializer = BoardCloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        board = clone_board(
+            request.user,
+            source,
+            serializer.validated_data.get('name', source.name),
+            serializer.validated_data['tasks'],
+        )
+        return Response(self.get_serializer(board).data, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'])
     def get_users_boards(self, request):
-        boards = UserBoard.objects.filter(id_user=request.user.id, is_admin=True).values_list(
-            'id_board'
-        )
+        boards = get_user_board_ids(request.user.id, is_admin=True)
         result = self.queryset.filter(id__in=boards)
 
-        serializer = self.get_serializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(self.get_serializer_class(), result)
+
+    # изменения доски после seq: ?since=<seq из прошлого ответа>
+    @action(detail=True, methods=['get'])
+    def changes(self, request, pk=None):
+        if not get_user_board(request, pk):
+            return Response('access denied', status.HTTP_403_FORBIDDEN)
+
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            return Response('since must be an integer', status.HTTP_400_BAD_REQUEST)
+
+        limit = KeysetPagination().get_page_size(request)
+        return Response(get_board_changes(pk, since, limit), status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'])
     def get_user_in_boards(self, request):
-        boards = UserBoard.objects.filter(id_user=request.user.id, is_admin=False).values_list(
-            'id_board'
-        )
+        boards = get_user_board_ids(request.user.id, is_admin=False)
         result = self.queryset.filter(id__in=boards)
 
-        serializer = self.get_serializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(self.get_serializer_class(), result)
 
     def retrieve(self, request, pk=None):
         instance = self.get_object()
 
-        check_id_board = UserBoard.objects.filter(
-            id_board=instance.id, id_user=request.user.id
-        ).first()
+        check_id_board = get_user_board(request, instance.id)
 
         if not check_id_board:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
 
+        not_modified = self.object_not_modified(instance)
+        if not_modified:
+            return not_modified
+
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
     def list(self, request):
-        boards = UserBoard.objects.filter(id_user=request.user.id).values_list(
-            'id_board'
-        )
+        boards = get_user_board_ids(request.user.id)
         result = self.queryset.filter(id__in=boards)
 
-        serializer = self.get_serializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(self.get_serializer_class(), result)
 
-    # При создании доски приписывает юзера к доске, как владельца
+    # При создании доски приписывает юзера к доске, как владельца.
+    # "defaults": true - добавить статусы и блоки по умолчанию (boards.py)
     def create(self, request):
-        board_serializer = self.get_serializer(data=request.data)
-        if board_serializer.is_valid():
-            board_serializer.save()
-
-            id_board = self.queryset.latest("id").id
-
-            user_role_data = {
-                "name": 'admin_role',
-                "id_board": id_board,
-                "delete_members": True,
-                "edit_members": True,
-                "editing_role": True,
-                "deleting_role": True,
-                "creating_role": True,
-            }
-            userrole_serializer = UserRoleSerializer(data=user_role_data)
-            if userrole_serializer.is_valid():
-                userrole_serializer.save()
-            else:
-                return Response(
-                    userrole_serializer.errors, status=status.HTTP_400_BAD_REQUEST
-                )
-            id_user_role = UserRole.objects.latest('id').id
-            user_board_data = {
-                "id_user": request.user.id,
-                "id_board": id_board,
-                "id_user_role": id_user_role,
-                "is_admin": True,
-            }
-            userboard_serializer = UserBoardSerializer(data=user_board_data)
-            if userboard_serializer.is_valid():
-                userboard_serializer.save()
-                return Response(board_serializer.data, status=status.HTTP_201_CREATED)
-            else:
-                return Response(
-                    userboard_serializer.errors, status=status.HTTP_400_BAD_REQUEST
-                )
-        else:
+        board_serializer = BoardCreateSerializer(data=request.data)
+        if not board_serializer.is_valid():
             return Response(board_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    # Выводит только те доски, в которых есть юзер
-    # def get_queryset(self):
-    #     user = self.request.user
-    #     return self.queryset.filter(
-    #         id__in=UserBoard.objects.all()
-    #         .filter(id_user=user.id)
-    #         .values_list("id_board", flat=True)
-    #     )
+        board = create_board(
+            request.user,
+            board_serializer.validated_data['name'],
+            board_serializer.validated_data['defaults'],
+        )
+        return Response(self.get_serializer(board).data, status=status.HTTP_201_CREATED)
 
 
 # Comment
-class CommentAPIView(ModelViewSet):
+class CommentAPIView(
+    MembershipScopedMixin, BoardVersionMixin, KeysetPaginatedMixin, ModelViewSet
+):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [IsOwnerCommentOrRole]
@@ -359,120 +574,250 @@ class CommentAPIView(ModelViewSet):
     def retrieve(self, request, pk=None):
         instance = self.get_object()
 
-        check_id_board = UserBoard.objects.filter(
-            id_board=instance.id_task.id_block.id_board.id, id_user=request.user.id
-        ).first()
-
-        print(check_id_board.is_admin)
+        check_id_board = get_user_board(request, instance.id_board_id)
 
         if not check_id_board:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
 
+        not_modified = self.object_not_modified(instance)
+        if not_modified:
+            return not_modified
+
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
     def list(self, request):
-        boards = UserBoard.objects.filter(id_user=request.user.id).values_list(
-            'id_board'
-        )
-        blocks = Block.objects.filter(id_board__in=boards).values_list('id')
-        tasks = Task.objects.filter(id_block__in=blocks).values_list('id')
-        result = self.queryset.filter(id_task__in=tasks)
+        boards = get_user_board_ids(request.user.id)
+        result = self.queryset.filter(id_board__in=boards)
 
-        serializer = self.get_serializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(self.get_serializer_class(), result)
 
     @action(detail=True, methods=['get'])
     def get_by_id_user(self, request, pk=None):
-        result = self.queryset.filter(id_user=pk)
-        serializer = self.get_serializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        result = self.live_boards(self.queryset.filter(id_user=pk))
+        return self.paginated_rows(self.get_serializer_class(), result)
 
     @action(detail=True, methods=['get'])
     def get_by_id_task(self, request, pk=None):
-        instance = Task.objects.get(id=pk)
-        check_pk = UserBoard.objects.filter(
-            id_board=instance.id_block.id_board.id, id_user=request.user.id
-        )
+        id_board, version, updated_at = Task.objects.values_list(
+            'id_board', 'id_board__version', 'id_board__updated_at'
+        ).get(id=pk)
+        check_pk = get_user_board(request, id_board)
         if not check_pk:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
+
+        not_modified = self.not_modified(id_board, version, updated_at)
+        if not_modified:
+            return not_modified
+
         result = self.queryset.filter(id_task=pk)
-        serializer = self.get_serializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(self.get_serializer_class(), result)
 
 
 # Block
-class BlockAPIView(ModelViewSet):
+class BlockAPIView(
+    MembershipScopedMixin, BoardVersionMixin, KeysetPaginatedMixin, ModelViewSet
+):
     queryset = Block.objects.all()
     serializer_class = BlockSerializer
     permission_classes = [IsUserRelateToBlockOrReadOnly]
+    keyset_ordering = ('rank', 'id')
+
+    def perform_update(self, serializer):
+        save_on_same_board(serializer, MOVE_WITH_TASKS_MESSAGE)
 
     def retrieve(self, request, pk=None):
         instance = self.get_object()
 
-        check_id_board = UserBoard.objects.filter(
-            id_board=instance.id_board, id_user=request.user.id
-        ).first()
+        check_id_board = get_user_board(request, instance.id_board_id)
 
         if not check_id_board:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
 
+        not_modified = self.object_not_modified(instance)
+        if not_modified:
+            return not_modified
+
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
     def list(self, request):
-        boards = UserBoard.objects.filter(id_user=request.user.id).values_list(
-            'id_board'
-        )
+        boards = get_user_board_ids(request.user.id)
         result = self.queryset.filter(id_board__in=boards)
 
-        serializer = self.get_serializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(self.get_serializer_class(), result)
+
+    # перенос блока: {after: id блока слева, before: id блока справа},
+    # меняется только ранг переносимого блока
+    @action(detail=True, methods=['patch'])
+    def move(self, request, pk=None):
+        block = self.get_object()
+        serializer = BlockMoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            move_block(block, **serializer.validated_data)
+        return Response(self.get_serializer(block).data)
 
 
 # Task
-class TaskAPIView(ModelViewSet):
+class TaskAPIView(
+    MembershipScopedMixin, BoardVersionMixin, KeysetPaginatedMixin, ModelViewSet
+):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [IsUserRelateToTaskOrReadOnly]
 
+    def perform_create(self, serializer):
+        save_on_same_board(serializer, TASK_BOARD_MESSAGE)
+
+    def perform_update(self, serializer):
+        save_on_same_board(serializer, TASK_BOARD_MESSAGE)
+
     def retrieve(self, request, pk=None):
         instance = self.get_object()
 
-        check_id_board = UserBoard.objects.filter(
-            id_board=instance.id_block.id_board, id_user=request.user.id
-        ).first()
+        check_id_board = get_user_board(request, instance.id_board_id)
 
         if not check_id_board:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
 
+        not_modified = self.object_not_modified(instance)
+        if not_modified:
+            return not_modified
+
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+    # фильтры и порядок - TaskFilterBackend (filters.py), только для списка:
+    # в filter_backends он менял бы и выбор объекта в get_object
     def list(self, request):
-        boards = UserBoard.objects.filter(id_user=request.user.id).values_list(
-            'id_board'
+        boards = get_user_board_ids(request.user.id)
+        backend = TaskFilterBackend()
+        result = backend.filter_queryset(
+            request, self.queryset.filter(id_board__in=boards), self
         )
-        blocks = Block.objects.filter(id_board__in=boards).values_list('id')
-        result = self.queryset.filter(id_block__in=blocks)
-
-        serializer = self.get_serializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        ordering = backend.get_ordering(request)
+
+        return self.paginated_rows(self.get_serializer_class(), result, ordering)
+
+    # перенос задачи: {id_block?, id_status_task?, after?, before?} одним UPDATE,
+    # after/before - соседние задачи в новом блоке
+    @action(detail=True, methods=['patch'])
+    def move(self, request, pk=None):
+        task = self.get_object()
+        serializer = TaskMoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            with transaction.atomic():
+                move_task(task, **serializer.validated_data)
+        except IntegrityError:
+            raise ValidationError(TASK_BOARD_MESSAGE)
+        return Response(self.get_serializer(task).data)
+
+    # пакетное создание: [{id_block, id_status_task, text, ...}, ...]
+    @action(
+        detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated]
+    )
+    def bulk_create(self, request):
+        check_batch_size(request.data)
+        serializer = BulkTaskSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        tasks = self.save_bulk(create_tasks, serializer.validated_data)
+        return Response(self.bulk_result(tasks), status.HTTP_201_CREATED)
+
+    # пакетное изменение и перенос: [{id, id_block?, id_status_task?, ...}, ...]
+    @action(
+        detail=False,
+        methods=['patch'],
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def bulk_update(self, request):
+        check_batch_size(request.data)
+        serializer = BulkTaskSerializer(data=request.data, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        tasks = self.save_bulk(update_tasks, serializer.validated_data)
+        return Response(self.bulk_result(tasks))
+
+    def save_bulk(self, operation, items):
+        try:
+            with transaction.atomic():
+                return operation(self.request, items)
+        except IntegrityError:
+            raise ValidationError(TASK_BOARD_MESSAGE)
+
+    def bulk_result(self, tasks):
+        result = Task.objects.filter(id__in=[task.id for task in tasks]).order_by('id')
+        return serialize_rows(self.get_serializer_class(), result)
 
     @action(detail=True, methods=['get'])
     def get_by_id_block(self, request, pk=None):
-        instance = Block.objects.get(id=pk)
-        check_pk = UserBoard.objects.filter(
-            id_board=instance.id_board, id_user=request.user.id
-        )
+        id_board, version, updated_at = Block.objects.values_list(
+            'id_board', 'id_board__version', 'id_board__updated_at'
+        ).get(id=pk)
+        check_pk = get_user_board(request, id_board)
         if not check_pk:
             return Response('access denied', status.HTTP_403_FORBIDDEN)
+
+        not_modified = self.not_modified(id_board, version, updated_at)
+        if not_modified:
+            return not_modified
+
+        # задачи блока - в порядке рангов
         result = self.queryset.filter(id_block=pk)
-        serializer = self.get_serializer(data=result, many=True)
-        serializer.is_valid()
-        return Response(serializer.data, status.HTTP_200_OK)
+        return self.paginated_rows(
+            self.get_serializer_class(), result, ordering=('rank', 'id')
+        )
+
+
+# Search
+# /api/search/?q=<запрос>[&type=task|comment][&board=<id>][&limit=<n>]
+class SearchAPIView(ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        kinds = tuple(SEARCH_KINDS)
+        kind = request.query_params.get('type')
+        if kind is not None:
+            if kind not in SEARCH_KINDS:
+                return Response('unknown type', status.HTTP_400_BAD_REQUEST)
+            kinds = (kind,)
+
+        params = self.search_params(request, SEARCH_LIMIT, SEARCH_MAX_LIMIT)
+        if isinstance(params, Response):
+            return params
+        query, boards, limit = params
+        return Response(search(boards, query, kinds, limit), status.HTTP_200_OK)
+
+    # нечеткий поиск задач по названию для перехода к задаче
+    @action(detail=False, methods=['get'], url_path='tasks')
+    def tasks(self, request):
+        params = self.search_params(request, FUZZY_LIMIT, FUZZY_MAX_LIMIT)
+        if isinstance(params, Response):
+            return params
+        query, boards, limit = params
+        return Response(find_tasks(boards, query, limit), status.HTTP_200_OK)
+
+    # (запрос, доски, limit) из ?q, ?board, ?limit или ответ с ошибкой
+    def search_params(self, request, default_limit, max_limit):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response('q is required', status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.query_params.get('limit', default_limit))
+            board = request.query_params.get('board')
+            board = int(board) if board is not None else None
+        except ValueError:
+            return Response(
+                'limit and board must be integers', status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, max_limit))
+
+        boards = get_user_board_ids(request.user.id)
+        if board is not None:
+            if board not in boards:
+                return Response('access denied', status.HTTP_403_FORBIDDEN)
+            boards = [board]
+        return query, boards, limit